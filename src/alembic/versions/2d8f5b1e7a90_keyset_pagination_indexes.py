@@ -0,0 +1,26 @@
+"""indexes for keyset pagination of rooms and room orders
+
+Revision ID: 2d8f5b1e7a90
+Revises: 9b2e6d4a1c7f
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+
+# revision identifiers, used by Alembic.
+revision = '2d8f5b1e7a90'
+down_revision = '9b2e6d4a1c7f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_rooms_number', 'rooms', ['number'])
+    op.create_index('ix_orders_room_identity', 'orders', ['room_id', 'identity'])
+
+
+def downgrade():
+    op.drop_index('ix_orders_room_identity', table_name='orders')
+    op.drop_index('ix_rooms_number', table_name='rooms')
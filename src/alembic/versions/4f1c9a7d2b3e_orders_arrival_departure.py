@@ -0,0 +1,112 @@
+"""move booking dates into orders, drop dates table
+
+Revision ID: 4f1c9a7d2b3e
+Revises: ce06f7cb2bd9
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c9a7d2b3e'
+down_revision = 'ce06f7cb2bd9'
+branch_labels = None
+depends_on = None
+
+# сколько ордеров переносить одним UPDATE/INSERT, каждая пачка коммитится отдельно
+BATCH_SIZE = 5000
+
+orders = sa.table(
+    'orders',
+    sa.column('id', sa.Integer),
+    sa.column('arrival', sa.Date),
+    sa.column('departure', sa.Date),
+)
+
+dates = sa.table(
+    'dates',
+    sa.column('order_id', sa.Integer),
+    sa.column('date', sa.Date),
+    sa.column('status', sa.String),
+)
+
+
+def _batches(connection, pending):
+    """id ордеров, подходящих под pending, пачками по BATCH_SIZE, keyset по id"""
+    last_id = 0
+    while True:
+        statement = (
+            sa.select(orders.c.id)
+            .where(orders.c.id > last_id, pending)
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        )
+        ids = connection.execute(statement).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def upgrade():
+    """перенос дат пачками, каждая в своей транзакции (autocommit_block)
+
+    блокировки строк и WAL не растут со всей таблицей, но миграция не атомарна:
+    после сбоя повторный запуск пропускает уже добавленные колонки и перенесенные ордера
+    """
+    connection = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(connection).get_columns('orders')}
+    if 'arrival' not in columns:
+        op.add_column('orders', sa.Column('arrival', sa.Date(), nullable=True))
+    if 'departure' not in columns:
+        op.add_column('orders', sa.Column('departure', sa.Date(), nullable=True))
+
+    values = {}
+    for column, status in (('arrival', 'ARRIVAL'), ('departure', 'DEPARTURE')):
+        values[column] = (
+            sa.select(dates.c.date)
+            .where(dates.c.order_id == orders.c.id, dates.c.status == status)
+            .limit(1)
+            .scalar_subquery()
+        )
+    # ордера без дат так и останутся с NULL, повторно их не выбираем по exists
+    pending = sa.and_(orders.c.arrival.is_(None), sa.exists().where(dates.c.order_id == orders.c.id))
+    with op.get_context().autocommit_block():
+        for ids in _batches(connection, pending):
+            connection.execute(orders.update().where(orders.c.id.in_(ids)).values(values))
+
+    op.create_index('ix_orders_room_dates', 'orders', ['room_id', 'arrival', 'departure'], unique=False)
+    op.drop_table('dates')
+    sa.Enum(name='status').drop(connection, checkfirst=True)
+
+
+def downgrade():
+    """обратный перенос пачками, каждая в своей транзакции, как в upgrade"""
+    connection = op.get_bind()
+    if not sa.inspect(connection).has_table('dates'):
+        op.create_table('dates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=True),
+        sa.Column('status', sa.Enum('ARRIVAL', 'DEPARTURE', name='status'), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    pending = ~sa.exists().where(dates.c.order_id == orders.c.id)
+    with op.get_context().autocommit_block():
+        for ids in _batches(connection, pending):
+            # обе даты ордера одним INSERT, чтобы пачка не разделилась между транзакциями
+            rows = sa.union_all(*(
+                sa.select(orders.c.id, orders.c[column], sa.literal(status)).where(orders.c.id.in_(ids))
+                for column, status in (('arrival', 'ARRIVAL'), ('departure', 'DEPARTURE'))
+            ))
+            connection.execute(dates.insert().from_select(['order_id', 'date', 'status'], rows))
+
+    op.drop_index('ix_orders_room_dates', table_name='orders')
+    op.drop_column('orders', 'departure')
+    op.drop_column('orders', 'arrival')
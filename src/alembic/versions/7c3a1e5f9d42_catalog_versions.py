@@ -0,0 +1,30 @@
+"""catalog version counters for cross-worker cache invalidation
+
+Revision ID: 7c3a1e5f9d42
+Revises: 2d8f5b1e7a90
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3a1e5f9d42'
+down_revision = '2d8f5b1e7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_versions = op.create_table(
+        'catalog_versions',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(catalog_versions, [{'name': 'rooms', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
@@ -0,0 +1,77 @@
+"""orders identity sequence and unique index
+
+Revision ID: 9b2e6d4a1c7f
+Revises: 4f1c9a7d2b3e
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import logging
+
+import sqlalchemy as sa
+
+from alembic import op
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e6d4a1c7f'
+down_revision = '4f1c9a7d2b3e'
+branch_labels = None
+depends_on = None
+
+SEQUENCE = 'orders_identity_seq'
+
+orders = sa.table(
+    'orders',
+    sa.column('id', sa.Integer),
+    sa.column('identity', sa.Integer),
+)
+
+
+def _renumber_duplicates(connection) -> int:
+    """повторные номера брони (гонка старой выдачи max + 1) получают новые номера после максимального
+
+    номер сохраняет бронь с меньшим id, иначе уникальный индекс не создастся
+    """
+    duplicates = (
+        sa.select(orders.c.identity)
+        .where(orders.c.identity.isnot(None))
+        .group_by(orders.c.identity)
+        .having(sa.func.count() > 1)
+    )
+    rows = connection.execute(
+        sa.select(orders.c.id, orders.c.identity)
+        .where(orders.c.identity.in_(duplicates))
+        .order_by(orders.c.identity, orders.c.id)
+    ).all()
+    next_identity = (connection.execute(sa.select(sa.func.max(orders.c.identity))).scalar() or 0) + 1
+    kept = set()
+    renumbered = 0
+    for order_id, identity in rows:
+        if identity not in kept:
+            kept.add(identity)
+            continue
+        connection.execute(orders.update().where(orders.c.id == order_id).values(identity=next_identity))
+        logger.warning("order id=%s: duplicate identity %s renumbered to %s", order_id, identity, next_identity)
+        next_identity += 1
+        renumbered += 1
+    return renumbered
+
+
+def upgrade():
+    connection = op.get_bind()
+    _renumber_duplicates(connection)
+    if connection.dialect.supports_sequences:
+        op.execute(sa.schema.CreateSequence(sa.Sequence(SEQUENCE)))
+        # продолжаем нумерацию с уже выданных номеров брони, включая перенумерованные
+        op.execute(
+            f"SELECT setval('{SEQUENCE}', COALESCE((SELECT MAX(identity) FROM orders), 0) + 1, false)"
+        )
+    op.create_index('ix_orders_identity', 'orders', ['identity'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_orders_identity', table_name='orders')
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(sa.Sequence(SEQUENCE)))
@@ -0,0 +1,143 @@
+"""репозитории на AsyncSession, те же запросы что и в repository.py
+
+ленивая загрузка в асинхронной сессии недоступна,
+поэтому связи, которые нужны сервисам, грузятся сразу
+"""
+from datetime import date
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hotel_california.adapters.repository import (
+    DEFAULT_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    AbstractRepository,
+    OrderView,
+    Page,
+    RoomView,
+    UserView,
+    all_rooms,
+    bump_catalog_version,
+    calendar_rows,
+    catalog_version,
+    free_rooms,
+    init_catalog_version,
+    known_room_orders,
+    make_page,
+    next_order_identity,
+    order_by_identity,
+    order_exists,
+    order_view,
+    orders_in_range,
+    room_by_number,
+    room_exists,
+    room_orders_page,
+    room_view,
+    room_views,
+    rooms_page,
+    user_by_email,
+    user_exists,
+    users_page,
+)
+from hotel_california.domain.models import Model, Order, Room, User
+
+
+class AsyncUserRepository(AbstractRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def add(self, model: Model):
+        self.session.add(model)
+
+    async def get(self, email: str) -> Optional[User]:
+        # token нужен при логине и обновлении токена
+        result = await self.session.execute(user_by_email(email, with_token=True))
+        return result.scalars().first()
+
+    async def exists(self, email: str) -> bool:
+        return (await self.session.execute(user_exists(email))).scalar()
+
+    async def all(self) -> List[Model]:
+        statement = select(User)
+        return (await self.session.execute(statement)).all()
+
+    async def page(self, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        rows = [UserView._make(i) for i in await self.session.execute(users_page(after, limit))]
+        return make_page(rows, limit, lambda i: i.id)
+
+
+class AsyncRoomRepository(AsyncUserRepository):
+    async def get(self, number: int, with_orders: bool = False, for_update: bool = False) -> Optional[Room]:
+        statement = room_by_number(number, with_orders=with_orders, for_update=for_update)
+        return (await self.session.execute(statement)).scalars().first()
+
+    async def next_order_identity(self) -> int:
+        statement = next_order_identity(self.session.bind.dialect)
+        return (await self.session.execute(statement)).scalar()
+
+    async def exists(self, number: int) -> bool:
+        return (await self.session.execute(room_exists(number))).scalar()
+
+    async def all(self, with_orders: bool = False) -> List[Model]:
+        return (await self.session.execute(all_rooms(with_orders))).all()
+
+    async def find_free(self, capacity: int, arrival: date, departure: date) -> List[RoomView]:
+        statement = free_rooms(capacity, arrival, departure)
+        return [RoomView._make(i) for i in await self.session.execute(statement)]
+
+    async def occupancy_rows(self, date_from: date, date_to: date) -> Tuple[List[RoomView], List[tuple]]:
+        room_rows = [RoomView._make(i) for i in await self.session.execute(room_views())]
+        order_rows = await self.session.execute(orders_in_range(date_from, date_to))
+        return room_rows, known_room_orders(room_rows, order_rows)
+
+    async def get_view(self, number: int) -> Optional[RoomView]:
+        row = (await self.session.execute(room_view(number))).first()
+        return RoomView._make(row) if row else None
+
+    async def catalog(self) -> List[RoomView]:
+        return [RoomView._make(i) for i in await self.session.execute(room_views())]
+
+    async def catalog_version(self, name: str) -> int:
+        return (await self.session.execute(catalog_version(name))).scalar() or 0
+
+    async def bump_catalog_version(self, name: str):
+        if not (await self.session.execute(bump_catalog_version(name))).rowcount:
+            await self.session.execute(init_catalog_version(name))
+
+    async def calendar_rows(self, date_from: date, date_to: date) -> List[tuple]:
+        return [tuple(i) for i in await self.session.execute(calendar_rows(date_from, date_to))]
+
+    async def page(self, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        rows = [RoomView._make(i) for i in await self.session.execute(rooms_page(after, limit))]
+        return make_page(rows, limit, lambda i: i.number)
+
+    async def orders_page(self, number: int, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        rows = [OrderView._make(i) for i in await self.session.execute(room_orders_page(number, after, limit))]
+        return make_page(rows, limit, lambda i: i.identity)
+
+
+class AsyncOrderRepository(AsyncUserRepository):
+    async def get(self, identity: int, with_room: bool = False) -> Optional[Order]:
+        return (await self.session.execute(order_by_identity(identity, with_room))).scalars().first()
+
+    async def get_view(self, identity: int) -> Optional[OrderView]:
+        row = (await self.session.execute(order_view(identity))).first()
+        return OrderView._make(row) if row else None
+
+    async def exists(self, identity: int) -> bool:
+        return (await self.session.execute(order_exists(identity))).scalar()
+
+    async def all(self) -> List[Model]:
+        statement = select(Order)
+        return (await self.session.execute(statement)).all()
+
+    async def delete(self, order: Order):
+        await self.session.delete(order)
+
+    async def stream_range(
+        self, date_from: date, date_to: date, batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator[list]:
+        result = await self.session.stream(orders_in_range(date_from, date_to))
+        async for partition in result.partitions(batch_size):
+            yield partition
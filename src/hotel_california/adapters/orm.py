@@ -1,9 +1,9 @@
 from sqlalchemy import Boolean, Column, ForeignKey, Integer, MetaData, String, Table, SmallInteger, Float, Date, \
-    Enum
+    Index, Sequence
 
 from sqlalchemy.orm import registry, relationship
 
-from hotel_california.domain.models import RefreshToken, User, Room, Status, Order, BookingDate
+from hotel_california.domain.models import RefreshToken, User, Room, Order
 
 mapper_registry = registry()
 
@@ -35,24 +35,35 @@ rooms = Table(
     Column("id", Integer, primary_key=True),
     Column("number", SmallInteger),
     Column("capacity", SmallInteger),
-    Column("price", Float)
+    Column("price", Float),
+    # постраничный вывод: number > ? ORDER BY number
+    Index("ix_rooms_number", "number"),
 )
 
+# номера броней, выдаются бд без гонок между воркерами
+order_identity_seq = Sequence("orders_identity_seq", metadata=metadata_obj)
+
 order = Table(
     "orders",
     metadata_obj,
     Column("id", Integer, primary_key=True),
     Column("room_id", Integer, ForeignKey("rooms.id")),
-    Column("identity", Integer)
+    Column("identity", Integer),
+    Column("arrival", Date),
+    Column("departure", Date),
+    # поиск пересечений броней комнаты: room_id = ? AND arrival < ?
+    Index("ix_orders_room_dates", "room_id", "arrival", "departure"),
+    Index("ix_orders_identity", "identity", unique=True),
+    # брони комнаты постранично: room_id = ? AND identity > ? ORDER BY identity
+    Index("ix_orders_room_identity", "room_id", "identity"),
 )
 
-dates = Table(
-    "dates",
+# счетчики изменений справочников, по ним воркеры сверяют свои кэши в памяти
+catalog_versions = Table(
+    "catalog_versions",
     metadata_obj,
-    Column("id", Integer, primary_key=True),
-    Column("order_id", Integer, ForeignKey("orders.id")),
-    Column("date", Date),
-    Column("status", Enum(Status))
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
 )
 
 
@@ -68,11 +79,7 @@ def start_mappers():
         Room,
         rooms,
         properties={"orders": relationship(Order, backref="room")})
-    mapper_registry.map_imperatively(
-        Order,
-        order,
-        properties={"dates": relationship(BookingDate, backref="order", cascade="all,delete")})
-    mapper_registry.map_imperatively(BookingDate, dates)
+    mapper_registry.map_imperatively(Order, order)
 
 
 def create_all_tables(engine):
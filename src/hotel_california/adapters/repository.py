@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, func, insert, or_, select, update
+from sqlalchemy.engine import Dialect
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.sql import Insert, Select, Update
 
-from hotel_california.domain.models import Model, User, Room, Order
+from hotel_california.adapters.orm import catalog_versions, order, order_identity_seq, rooms, user
+from hotel_california.domain.models import Model, User, Room, Order, booking_span
 
 
 class AbstractRepository(ABC):
@@ -17,6 +21,227 @@ class AbstractRepository(ABC):
         raise NotImplementedError
 
 
+def _room_orders_loader():
+    """Room.orders одним SELECT ... IN вместо ленивой загрузки на каждую комнату (N+1)"""
+    return selectinload(Room.orders)
+
+
+# проекции для чтения: только нужные колонки в кортежи, без моделей и identity map
+
+
+class RoomView(NamedTuple):
+    number: int
+    capacity: int
+    price: float
+
+
+class OrderView(NamedTuple):
+    identity: int
+    arrival: date
+    departure: date
+
+
+class UserView(NamedTuple):
+    id: int
+    name: str
+    email: str
+    is_admin: bool
+
+
+ROOM_VIEW_COLUMNS = (rooms.c.number, rooms.c.capacity, rooms.c.price)
+ORDER_VIEW_COLUMNS = (order.c.identity, order.c.arrival, order.c.departure)
+USER_VIEW_COLUMNS = (user.c.id, user.c.name, user.c.email, user.c.is_admin)
+
+
+# построение запросов общее для синхронных и асинхронных репозиториев
+
+
+def user_by_email(email: str, with_token: bool = False) -> Select:
+    statement = select(User).filter_by(email=email)
+    if with_token:
+        statement = statement.options(selectinload(User.token))
+    return statement
+
+
+def user_exists(email: str) -> Select:
+    return select(exists().where(user.c.email == email))
+
+
+def room_by_number(number: int, with_orders: bool = False, for_update: bool = False) -> Select:
+    statement = select(Room).filter_by(number=number)
+    if with_orders:
+        statement = statement.options(_room_orders_loader())
+    if for_update:
+        statement = statement.with_for_update()
+    return statement
+
+
+def room_exists(number: int) -> Select:
+    return select(exists().where(rooms.c.number == number))
+
+
+def all_rooms(with_orders: bool = False) -> Select:
+    statement = select(Room)
+    if with_orders:
+        statement = statement.options(_room_orders_loader())
+    return statement
+
+
+def room_views() -> Select:
+    return select(*ROOM_VIEW_COLUMNS).order_by(rooms.c.number)
+
+
+def room_view(number: int) -> Select:
+    return select(*ROOM_VIEW_COLUMNS).where(rooms.c.number == number)
+
+
+def catalog_version(name: str) -> Select:
+    return select(catalog_versions.c.version).where(catalog_versions.c.name == name)
+
+
+def bump_catalog_version(name: str) -> Update:
+    return (
+        update(catalog_versions)
+        .where(catalog_versions.c.name == name)
+        .values(version=catalog_versions.c.version + 1)
+    )
+
+
+def init_catalog_version(name: str) -> Insert:
+    """счетчик создается миграцией, вставка только если его нет (например бд из create_all)"""
+    return insert(catalog_versions).values(name=name, version=1)
+
+
+def _order_overlaps(date_from: date, date_to: date):
+    """бронь пересекается с [date_from, date_to), бронь без ночей занимает день заезда"""
+    return and_(order.c.arrival < date_to, or_(order.c.departure > date_from, order.c.arrival >= date_from))
+
+
+def free_rooms(capacity: int, arrival: date, departure: date) -> Select:
+    """свободные комнаты нужной вместимости
+
+    комнаты с пересекающейся бронью отсекаются через NOT EXISTS,
+    семантика пересечения та же что у BookingIndex
+    """
+    arrival, departure = booking_span(arrival, departure)
+    overlap = select(order.c.id).where(order.c.room_id == rooms.c.id, _order_overlaps(arrival, departure))
+    return (
+        select(*ROOM_VIEW_COLUMNS)
+        .where(rooms.c.capacity == capacity, ~exists(overlap))
+        .order_by(rooms.c.number)
+    )
+
+
+def order_by_identity(identity: int, with_room: bool = False) -> Select:
+    statement = select(Order).filter_by(identity=identity)
+    if with_room:
+        # комната брони тем же запросом через join
+        statement = statement.options(joinedload(Order.room))
+    return statement
+
+
+def order_view(identity: int) -> Select:
+    return select(*ORDER_VIEW_COLUMNS).where(order.c.identity == identity)
+
+
+def order_exists(identity: int) -> Select:
+    return select(exists().where(order.c.identity == identity))
+
+
+def next_order_identity(dialect: Dialect) -> Select:
+    """номер брони из последовательности бд, O(1) и без коллизий между процессами
+
+    у sqlite последовательностей нет, там max + 1 по уникальному индексу
+    """
+    if dialect.supports_sequences:
+        return select(order_identity_seq.next_value())
+    return select(func.coalesce(func.max(order.c.identity), 0) + 1)
+
+
+def orders_in_range(date_from: date, date_to: date) -> Select:
+    """брони, пересекающиеся с [date_from, date_to), плоскими строками без сборки моделей
+
+    колонки: identity, room, arrival, departure
+    """
+    return (
+        select(order.c.identity, rooms.c.number.label("room"), order.c.arrival, order.c.departure)
+        .join_from(order, rooms, order.c.room_id == rooms.c.id)
+        .where(_order_overlaps(date_from, date_to))
+        .order_by(order.c.identity)
+    )
+
+
+def known_room_orders(room_rows: List[RoomView], order_rows: Iterable[tuple]) -> List[tuple]:
+    """брони только прочитанных комнат
+
+    комнаты и брони читаются разными запросами, комната с бронью, закоммиченные
+    между ними, попали бы в брони без строки комнаты
+    """
+    numbers = {room.number for room in room_rows}
+    return [tuple(i) for i in order_rows if i[1] in numbers]
+
+
+def calendar_rows(date_from: date, date_to: date) -> Select:
+    """все комнаты по номеру с бронями, пересекающимися с [date_from, date_to)
+
+    колонки: number, capacity, price, identity, arrival, departure,
+    у комнаты без броней одна строка с пустыми колонками брони
+    """
+    room_orders = and_(order.c.room_id == rooms.c.id, _order_overlaps(date_from, date_to))
+    return (
+        select(*ROOM_VIEW_COLUMNS, *ORDER_VIEW_COLUMNS)
+        .select_from(rooms.outerjoin(order, room_orders))
+        .order_by(rooms.c.number, order.c.arrival)
+    )
+
+
+# строк за одну выборку из серверного курсора при выгрузке
+STREAM_BATCH_SIZE = 1000
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class Page(NamedTuple):
+    """страница выборки по ключу (keyset)
+
+    next - курсор для следующей страницы (after), None если страница последняя
+    """
+
+    items: List[Any]
+    next: Optional[Any] = None
+
+
+def make_page(rows: Sequence[Any], limit: int, key: Callable[[Any], Any]) -> Page:
+    """rows выбраны с limit + 1, лишняя строка только говорит что есть следующая страница"""
+    items = list(rows[:limit])
+    return Page(items, key(items[-1]) if len(rows) > limit else None)
+
+
+def rooms_page(after: Optional[int], limit: int) -> Select:
+    statement = select(*ROOM_VIEW_COLUMNS).order_by(rooms.c.number).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(rooms.c.number > after)
+    return statement
+
+
+def room_orders_page(number: int, after: Optional[int], limit: int) -> Select:
+    room_id = select(rooms.c.id).where(rooms.c.number == number).scalar_subquery()
+    statement = (
+        select(*ORDER_VIEW_COLUMNS).where(order.c.room_id == room_id).order_by(order.c.identity).limit(limit + 1)
+    )
+    if after is not None:
+        statement = statement.where(order.c.identity > after)
+    return statement
+
+
+def users_page(after: Optional[int], limit: int) -> Select:
+    statement = select(*USER_VIEW_COLUMNS).order_by(user.c.id).limit(limit + 1)
+    if after is not None:
+        statement = statement.where(user.c.id > after)
+    return statement
+
+
 class FakeDb(AbstractRepository):
     def __init__(self, data: List[Model]) -> None:
         self._data = set(data)
@@ -67,29 +292,107 @@ class UserRepository(AbstractRepository):
         self.session.add(model)
 
     def get(self, email: str) -> Optional[User]:
-        statement = select(User).filter_by(email=email)
-        return self.session.execute(statement).one()
+        return self.session.execute(user_by_email(email)).scalars().first()
+
+    def exists(self, email: str) -> bool:
+        return self.session.execute(user_exists(email)).scalar()
 
     def all(self) -> List[Model]:
         statement = select(User)
         return self.session.execute(statement).all()
 
+    def page(self, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """пользователи по id начиная после after"""
+        rows = [UserView._make(i) for i in self.session.execute(users_page(after, limit))]
+        return make_page(rows, limit, lambda i: i.id)
+
 
 class RoomRepository(UserRepository):
 
-    def get(self, number: int) -> Optional[Room]:
-        statement = select(Room).filter_by(number=number)
-        return self.session.execute(statement).one()
+    def get(self, number: int, with_orders: bool = False, for_update: bool = False) -> Optional[Room]:
+        """комната по номеру
 
-    def all(self) -> List[Model]:
-        statement = select(Room)
-        return self.session.execute(statement).all()
+        Args:
+            number: номер комнаты
+            with_orders: сразу загрузить ордера, если вызывающему нужны брони
+            for_update: заблокировать строку комнаты до конца транзакции (SELECT ... FOR UPDATE)
+        """
+        statement = room_by_number(number, with_orders=with_orders, for_update=for_update)
+        return self.session.execute(statement).scalars().first()
+
+    def next_order_identity(self) -> int:
+        statement = next_order_identity(self.session.get_bind().dialect)
+        return self.session.execute(statement).scalar()
+
+    def exists(self, number: int) -> bool:
+        return self.session.execute(room_exists(number)).scalar()
+
+    def all(self, with_orders: bool = False) -> List[Model]:
+        return self.session.execute(all_rooms(with_orders)).all()
+
+    def find_free(self, capacity: int, arrival: date, departure: date) -> List[RoomView]:
+        """свободные комнаты нужной вместимости одним запросом"""
+        statement = free_rooms(capacity, arrival, departure)
+        return [RoomView._make(i) for i in self.session.execute(statement)]
+
+    def occupancy_rows(self, date_from: date, date_to: date) -> Tuple[List[RoomView], List[tuple]]:
+        """все комнаты и брони за период (identity, room, arrival, departure) для матрицы занятости"""
+        room_rows = [RoomView._make(i) for i in self.session.execute(room_views())]
+        order_rows = self.session.execute(orders_in_range(date_from, date_to))
+        return room_rows, known_room_orders(room_rows, order_rows)
+
+    def get_view(self, number: int) -> Optional[RoomView]:
+        row = self.session.execute(room_view(number)).first()
+        return RoomView._make(row) if row else None
+
+    def catalog(self) -> List[RoomView]:
+        """все комнаты по номеру"""
+        return [RoomView._make(i) for i in self.session.execute(room_views())]
+
+    def catalog_version(self, name: str) -> int:
+        return self.session.execute(catalog_version(name)).scalar() or 0
+
+    def bump_catalog_version(self, name: str):
+        """увеличить счетчик изменений справочника в текущей транзакции"""
+        if not self.session.execute(bump_catalog_version(name)).rowcount:
+            self.session.execute(init_catalog_version(name))
+
+    def calendar_rows(self, date_from: date, date_to: date) -> List[tuple]:
+        """комнаты с бронями за период одним запросом, см. calendar_rows"""
+        return [tuple(i) for i in self.session.execute(calendar_rows(date_from, date_to))]
+
+    def page(self, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """комнаты по номеру начиная после after"""
+        rows = [RoomView._make(i) for i in self.session.execute(rooms_page(after, limit))]
+        return make_page(rows, limit, lambda i: i.number)
+
+    def orders_page(self, number: int, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """брони комнаты по номеру брони начиная после after"""
+        rows = [OrderView._make(i) for i in self.session.execute(room_orders_page(number, after, limit))]
+        return make_page(rows, limit, lambda i: i.identity)
 
 
 class OrderRepository(UserRepository):
+    def get(self, identity: int, with_room: bool = False) -> Optional[Order]:
+        return self.session.execute(order_by_identity(identity, with_room)).scalars().first()
+
+    def get_view(self, identity: int) -> Optional[OrderView]:
+        row = self.session.execute(order_view(identity)).first()
+        return OrderView._make(row) if row else None
+
+    def exists(self, identity: int) -> bool:
+        return self.session.execute(order_exists(identity)).scalar()
+
     def all(self) -> List[Model]:
         statement = select(Order)
         return self.session.execute(statement).all()
 
     def delete(self, order: Order):
         self.session.delete(order)
+
+    def stream_range(self, date_from: date, date_to: date, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[list]:
+        """брони за период пачками из серверного курсора, в памяти одна пачка"""
+        result = self.session.execute(
+            orders_in_range(date_from, date_to), execution_options={"stream_results": True}
+        )
+        yield from result.partitions(batch_size)
@@ -1,9 +1,128 @@
-from sqlalchemy import create_engine
+import logging
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from hotel_california.config import get_settings
 
 settings = get_settings()
 
+logger = logging.getLogger("hotel_california.sql")
+
+# модули сервисов, которым приписываются запросы в логе
+SERVICE_MODULES = {
+    "hotel_california.service_layer.service.hotel": "hotel",
+    "hotel_california.service_layer.service.hotel_async": "hotel_async",
+}
+MAX_PARAMETERS_LENGTH = 500
+
+# формы запросов текущего http запроса, для поиска N+1
+_statements: ContextVar[Optional[Counter]] = ContextVar("statements", default=None)
+
+
+@contextmanager
+def statement_scope():
+    """границы одного запроса к приложению для предупреждений о N+1"""
+    token = _statements.set(Counter())
+    try:
+        yield
+    finally:
+        _statements.reset(token)
+
+
+def _service_names_from_frames(frame) -> List[str]:
+    res = []
+    while frame is not None:
+        module = SERVICE_MODULES.get(frame.f_globals.get("__name__"))
+        if module:
+            res.append(f"{module}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    return res
+
+
+def service_function() -> Optional[str]:
+    """внешняя функция сервиса в стеке, например hotel.booking
+
+    у AsyncSession запрос выполняется в дочернем greenlet, корутины сервиса
+    остаются в стеке родительского greenlet
+    """
+    frames = [sys._getframe(1)]
+    current = getcurrent().parent
+    while current is not None:
+        frames.append(current.gr_frame)
+        current = current.parent
+    names = []
+    for frame in frames:
+        names.extend(_service_names_from_frames(frame))
+    return names[-1] if names else None
+
+
+class QueryLog:
+    """лог медленных запросов и предупреждения о повторяющихся запросах (N+1)
+
+    Args:
+        slow_query_ms: запросы дольше порога пишутся в лог с параметрами, None - выключено
+        n_plus_one_threshold: предупреждение если одна форма запроса выполнилась
+            больше раз за http запрос, None - выключено
+    """
+
+    def __init__(self, slow_query_ms: Optional[float] = None, n_plus_one_threshold: Optional[int] = None):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def install(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def remove(self, engine: Engine):
+        event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_log_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_log_start"].pop()) * 1000
+        if self.slow_query_ms is not None and duration_ms >= self.slow_query_ms:
+            logger.warning(
+                "slow query %.1fms in %s: %s parameters=%.*s",
+                duration_ms, service_function() or "unknown", statement, MAX_PARAMETERS_LENGTH, repr(parameters),
+            )
+        statements = _statements.get()
+        if self.n_plus_one_threshold is not None and statements is not None:
+            statements[statement] += 1
+            # одно предупреждение на форму запроса, при первом превышении
+            if statements[statement] == self.n_plus_one_threshold + 1:
+                logger.warning(
+                    "possible N+1 in %s: statement executed more than %s times: %s",
+                    service_function() or "unknown", self.n_plus_one_threshold, statement,
+                )
+
+
 engine = create_engine(settings.DB.url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# асинхронный движок создается только в async режиме, драйвер (asyncpg) опциональный
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB.async_mode:
+    async_engine = create_async_engine(settings.DB.async_url)
+    AsyncSessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=async_engine, class_=AsyncSession
+    )
+
+query_log = None
+if settings.DB.slow_query_ms is not None or settings.DB.n_plus_one_threshold is not None:
+    query_log = QueryLog(settings.DB.slow_query_ms, settings.DB.n_plus_one_threshold)
+    query_log.install(engine)
+    if async_engine is not None:
+        query_log.install(async_engine.sync_engine)
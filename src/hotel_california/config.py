@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import BaseSettings
 from pathlib import Path
@@ -38,17 +39,63 @@ class DatabaseSqlalchemy(BaseSettings):
     """вот эту часть думаю можно менять чтобы добавить mysql"""
 
     dialect: str = "postgresql"
+    # AsyncSession и асинхронный драйвер вместо синхронного движка
+    async_mode: bool = False
+    async_dialect: str = "postgresql+asyncpg"
+    # лог запросов дольше порога в мс с функцией сервиса, None - выключен
+    slow_query_ms: Optional[float] = None
+    # предупреждение если одна форма запроса выполнилась больше раз за http запрос
+    n_plus_one_threshold: Optional[int] = None
     credentials: Credentials = Credentials()
 
+    def _url(self, dialect: str) -> str:
+        return f"{dialect}://{self.credentials.user}:{self.credentials.password}@{self.credentials.host}:{self.credentials.port}/{self.credentials.database}"
+
     @property
     def url(self):
-        return f"{self.dialect}://{self.credentials.user}:{self.credentials.password}@{self.credentials.host}:{self.credentials.port}/{self.credentials.database}"
+        return self._url(self.dialect)
+
+    @property
+    def async_url(self):
+        return self._url(self.async_dialect)
 
 
 class Security(BaseSettings):
     SECRET_KEY: str = "insecure_mock"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt выполняется в отдельном пуле потоков
+    PASSWORD_POOL_SIZE: int = 4
+    # сколько задач может ждать свободного потока, сверх этого - 503
+    PASSWORD_POOL_QUEUE: int = 32
+    PASSWORD_POOL_RETRY_AFTER: int = 1
+    # кэш пользователей авторизованных по cookie
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: int = 60
+    # кэш проверенных jwt
+    TOKEN_CACHE_SIZE: int = 4096
+    TOKEN_CACHE_TTL: int = 300
+
+
+class Search(BaseSettings):
+    # поиск свободных комнат по матрице занятости в памяти процесса вместо запроса к бд
+    occupancy_map: bool = False
+    # окно матрицы в днях от сегодня, поиск дальше окна идет в бд
+    occupancy_days: int = 365
+    # кэш результатов поиска по (вместимость, заезд, выезд), 0 - выключен,
+    # бронь и отмена этого процесса сбрасывают только пересекающиеся по датам записи
+    # той же вместимости, брони из других процессов видны не позже чем через ttl
+    cache_size: int = 1024
+    cache_ttl: int = 10
+
+
+class CatalogCache(BaseSettings):
+    # справочник комнат в памяти процесса, сбрасывается при add_room этого процесса,
+    # комнаты добавленные в других процессах видны не позже чем через ttl
+    ttl: Optional[int] = 60
+    # сверять версию справочника в бд на каждом чтении (один запрос по ключу),
+    # тогда изменения из других процессов видны сразу
+    version_check: bool = False
 
 
 class Folders(BaseSettings):
@@ -62,6 +109,8 @@ class Settings(BaseSettings):
     APP_NAME = "hotel_california"
     DB: DatabaseSqlalchemy = DatabaseSqlalchemy()
     AUTH: Security = Security()
+    SEARCH: Search = Search()
+    CATALOG: CatalogCache = CatalogCache()
     PATHS: Folders = Folders()
 
     class Config:
@@ -1,8 +1,9 @@
 import enum
 from abc import ABC
+from bisect import bisect_left, insort
 from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 from email_validator import EmailNotValidError, validate_email
 from jose import jwt
@@ -27,6 +28,9 @@ settings = get_settings()
 APP_NAME = settings.APP_NAME
 AUDIENCE = "/users/token/refresh/"
 LOGIN_URL = "users/login"
+# роль пользователя в claim "role" access токена
+ROLE_ADMIN = "admin"
+ROLE_MANAGER = "manager"
 SECRET_KEY = settings.AUTH.SECRET_KEY
 ALGORITHM = settings.AUTH.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.AUTH.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -68,22 +72,82 @@ class BookingDate(Model):
 class Order(Model):
     identity: int
     # даты желаемого заезда и выезда
-    dates: List[BookingDate] = field(default_factory=list)
+    arrival: date
+    departure: date
 
-    def __post_init__(self):
+    @property
+    def get_dict(self) -> dict:
+        return {
+            "identity": self.identity,
+            "arrival": self.arrival,
+            "departure": self.departure,
+        }
 
-        assert len(self.dates) == 2, "Две даты в ордере"
 
-    @property
-    def get_dict(self) -> dict:  # из-за того что я даты прибытия убытия храню списком очень сложное получение
-        res = {}
-        for i in self.dates:
-            if i.status == Status.ARRIVAL:
-                res["arrival"] = i.date
-            elif i.status == Status.DEPARTURE:
-                res["departure"] = i.date
-        res["identity"] = self.identity
-        return res
+def booking_span(arrival: date, departure: date) -> Tuple[date, date]:
+    """полуинтервал [arrival, departure) брони, минимум одна ночь
+
+    бронь с одинаковыми датами заезда и выезда занимает день заезда
+    """
+    return arrival, max(departure, arrival + timedelta(days=1))
+
+
+class BookingIndex:
+    """отсортированный по дате заезда индекс броней одной комнаты
+
+    хранит полуинтервалы [arrival, departure) и префиксный максимум дат выезда,
+    поэтому проверка пересечения - один bisect, O(log n)
+    """
+
+    def __init__(self, orders: Iterable[Order] = ()) -> None:
+        spans = sorted(self._span(order) for order in orders)
+        self._arrivals: List[date] = [i[0] for i in spans]
+        self._spans: List[Tuple[date, date, int]] = spans
+        self._max_departures: List[date] = []
+        self._rebuild_from(0)
+
+    @staticmethod
+    def _span(order: Order) -> Tuple[date, date, int]:
+        arrival, departure = booking_span(order.arrival, order.departure)
+        return arrival, departure, order.identity
+
+    def _rebuild_from(self, position: int):
+        del self._max_departures[position:]
+        current = self._max_departures[-1] if self._max_departures else None
+        for _, departure, _ in self._spans[position:]:
+            current = departure if current is None else max(current, departure)
+            self._max_departures.append(current)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def add(self, order: Order):
+        span = self._span(order)
+        position = bisect_left(self._spans, span)
+        insort(self._spans, span)
+        self._arrivals.insert(position, span[0])
+        self._rebuild_from(position)
+
+    def remove(self, order: Order):
+        span = self._span(order)
+        position = bisect_left(self._spans, span)
+        if position < len(self._spans) and self._spans[position] == span:
+            del self._spans[position]
+            del self._arrivals[position]
+            self._rebuild_from(position)
+
+    def is_free(self, arrival: date, departure: date) -> bool:
+        """свободен ли полуинтервал [arrival, departure)
+
+        пересекаются только брони с заездом раньше запрошенного выезда,
+        среди них достаточно проверить максимальную дату выезда
+        (это покрывает и брони, целиком содержащие запрошенный интервал)
+        """
+        arrival, departure = booking_span(arrival, departure)
+        position = bisect_left(self._arrivals, departure)
+        if position == 0:
+            return True
+        return self._max_departures[position - 1] <= arrival
 
 
 @dataclass(unsafe_hash=True)
@@ -99,6 +163,26 @@ class Room(Model):
         assert self.capacity > 0, "Bместительность capacity должно быть больше нуля"
         assert self.price > 0, "Цена price должна быть больше нуля"
 
+    @property
+    def bookings(self) -> BookingIndex:
+        """индекс броней, строится при первом обращении
+
+        хранится вне полей dataclass, чтобы не попадать в asdict и маппинг алхимии
+        """
+        index = self.__dict__.get("_bookings")
+        if index is None:
+            index = BookingIndex(self.orders)
+            self.__dict__["_bookings"] = index
+        return index
+
+    def add_order(self, order: Order):
+        self.bookings.add(order)
+        self.orders.append(order)
+
+    def remove_order(self, order: Order):
+        self.bookings.remove(order)
+        self.orders.remove(order)
+
 
 @dataclass(unsafe_hash=True)
 class RefreshToken(Model):
@@ -136,8 +220,14 @@ class UserManager:
     ACCESS_TOKEN_EXPIRE_MINUTES = ACCESS_TOKEN_EXPIRE_MINUTES
     REFRESH_TOKEN_EXPIRE_MINUTES = REFRESH_TOKEN_EXPIRE_MINUTES  # время действия 3 дня
 
-    def __init__(self, users: Dict[str, User]) -> None:
+    def __init__(self, users: Dict[str, User], passwords=PasswordContext) -> None:
+        """
+        Args:
+            users: пользователи по email
+            passwords: объект с hash/verify как у CryptContext, например пул потоков для bcrypt
+        """
         self.users = users
+        self.passwords = passwords
 
     def _validate(self, email: str) -> bool:
         if email in self.users:
@@ -150,7 +240,7 @@ class UserManager:
             raise NotFoundEmail(email) from err
 
     def _hash_password(self, password: str) -> str:
-        return PasswordContext.hash(password)
+        return self.passwords.hash(password)
 
     def check_admin(self, email: str) -> bool:
         user = self.exists(email)
@@ -159,14 +249,17 @@ class UserManager:
         raise UserNotAdmin(email)
 
     def _check_credentials(self, password_raw: str, password: str):
-        if not PasswordContext.verify(password_raw, password):
+        if not self.passwords.verify(password_raw, password):
             return False
         return True
 
     def create(self, name: str, email: str, password: str, is_admin: bool = False) -> User:
+        return self.create_with_hash(name, email, self._hash_password(password), is_admin)
+
+    def create_with_hash(self, name: str, email: str, password_hash: str, is_admin: bool = False) -> User:
+        """пользователь с уже посчитанным hash пароля"""
         self._validate(email)
-        password = self._hash_password(password)
-        return User(name, email, password, is_admin)
+        return User(name, email, password_hash, is_admin)
 
     def login(self, email: str, password: str) -> User:
         u = self.exists(email=email)
@@ -175,7 +268,7 @@ class UserManager:
         return u
 
     def _get_token(
-            self, email: str, expires_delta: int, audience: Optional[str] = None
+            self, email: str, expires_delta: int, audience: Optional[str] = None, role: Optional[str] = None
     ) -> str:
         payload = {
             "iss": self.APP_NAME,
@@ -184,10 +277,22 @@ class UserManager:
         }
         if audience:
             payload["aud"] = audience
+        if role:
+            payload["role"] = role
         return jwt.encode(payload, self.SECRET_KEY, algorithm=self.ALGORITHM)
 
+    def get_role(self, email: str) -> str:
+        user = self.exists(email)
+        return ROLE_ADMIN if user.is_admin else ROLE_MANAGER
+
     def get_access_token(self, email: str, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES) -> str:
-        return self._get_token(email, expires_delta=expires_delta)
+        """access токен с ролью пользователя
+
+        права проверяются по claim без запроса к бд, смена роли вступает в силу
+        с новым access токеном: не позже чем через ACCESS_TOKEN_EXPIRE_MINUTES,
+        refresh берет роль заново из бд
+        """
+        return self._get_token(email, expires_delta=expires_delta, role=self.get_role(email))
 
     def get_refresh_token(self, email: str) -> str:
         return self._get_token(
@@ -230,21 +335,9 @@ class RoomManager:
             True - свободна
             False - занята
 
-        Raises:
-            RoomNonFree: Если комната не свободна то RoomNonFree
         """
         arrival, departure = dates
-        for i in room.orders:
-            order = i.get_dict
-            if order['arrival'] == arrival.date:
-                return False
-            if order['arrival'] == arrival.date and order['departure'] == departure.date:
-                return False
-            if order['arrival'] < arrival.date < order['departure']:
-                return False
-            if order['arrival'] < departure.date < order['departure']:
-                return False
-        return True
+        return room.bookings.is_free(arrival.date, departure.date)
 
     def create(self, number: int, capacity: int, price: float) -> Room:
         self._validate(number)
@@ -283,13 +376,15 @@ class RoomManager:
 class OrderManager:
     def __init__(self, orders: Dict[int, Order]):
         self.orders = orders
+        self._last_id = max(orders.keys(), default=0)
 
     def get_id(self) -> int:
-        """чтото типа автоинкремента pk"""
-        if self.orders:
-            return max(self.orders.keys()) + 1
+        """чтото типа автоинкремента pk
 
-        return 1
+        для агрегата в памяти, в бд номера выдает последовательность
+        """
+        self._last_id += 1
+        return self._last_id
 
     @classmethod
     def init(cls, orders: List[Order]) -> "OrderManager":
@@ -298,15 +393,22 @@ class OrderManager:
             res[order.identity] = order
         return cls(res)
 
-    def create(self, dates: Tuple[BookingDate, BookingDate]) -> Order:
+    def create(self, dates: Tuple[BookingDate, BookingDate], identity: Optional[int] = None) -> Order:
+        """новый ордер
+
+        Args:
+            dates: кортеж дат прибытия/убытия
+            identity: номер брони, если выдан снаружи (например бд), иначе get_id
+        """
         arrival, departure = dates
         if arrival.date > departure.date:
             message = "Дата прибытия позже чем дата убытия"
             raise DatesNotValid(message)
-        order_id = self.get_id()
+        order_id = self.get_id() if identity is None else identity
         return Order(
             identity=order_id,
-            dates=list(dates)
+            arrival=arrival.date,
+            departure=departure.date,
         )
 
     def get_order_by_id(self, order_id: int) -> Order:
@@ -318,8 +420,4 @@ class OrderManager:
     @staticmethod
     def check_can_delete(order: Order) -> bool:
         today = date.today()
-        for i in order.dates:
-            if i.status == Status.ARRIVAL:
-                if (i.date - today) > timedelta(days=3):
-                    return True
-        return False
+        return (order.arrival - today) > timedelta(days=3)
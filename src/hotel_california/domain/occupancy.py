@@ -0,0 +1,211 @@
+"""занятость всех комнат по дням одной матрицей numpy
+
+строка - комната (по возрастанию номера), столбец - ночь от start,
+поиск свободных комнат - один срез по датам и any по строкам вместо
+проверки BookingIndex каждой комнаты в цикле.
+Calendar - та же сетка с номерами броней для календаря занятости
+"""
+from datetime import date, timedelta
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from hotel_california.domain.models import booking_span
+from hotel_california.service_layer.exceptions import RoomExistError, RoomNotFound
+
+
+def _days(values: Sequence[date], start: date) -> np.ndarray:
+    """номера дней от start"""
+    return np.fromiter((i.toordinal() for i in values), dtype=np.int64, count=len(values)) - start.toordinal()
+
+
+class OccupancyMap:
+    """матрица занятости rooms x days на окне [start, start + days)
+
+    брони вне окна обрезаются, поиск по датам вне окна не поддерживается (covers),
+    брони одной комнаты не пересекаются (проверяется при бронировании),
+    поэтому снятие брони просто очищает ее ночи
+    """
+
+    def __init__(self, start: date, days: int):
+        self.start = start
+        self.days = days
+        self.numbers = np.empty(0, dtype=np.int64)
+        self.capacities = np.empty(0, dtype=np.int64)
+        self.prices = np.empty(0, dtype=np.float64)
+        self.busy = np.zeros((0, days), dtype=bool)
+        # номер брони -> номер комнаты, только для броней попавших в окно
+        self._orders: Dict[int, int] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def build(
+            cls,
+            start: date,
+            days: int,
+            rooms: Iterable[Tuple[int, int, float]],
+            orders: Iterable[Tuple[int, int, date, date]],
+    ) -> "OccupancyMap":
+        """матрица по комнатам (number, capacity, price) и броням (identity, room, arrival, departure)
+
+        заполнение через разностный массив: +1 в день заезда, -1 в день выезда, cumsum по строке
+        """
+        occupancy = cls(start, days)
+        rooms = sorted(rooms)
+        if rooms:
+            numbers, capacities, prices = zip(*rooms)
+            occupancy.numbers = np.array(numbers, dtype=np.int64)
+            occupancy.capacities = np.array(capacities, dtype=np.int64)
+            occupancy.prices = np.array(prices, dtype=np.float64)
+        orders = [
+            (identity, room) + booking_span(arrival, departure) for identity, room, arrival, departure in orders
+        ]
+        width = days + 1
+        size = len(occupancy.numbers) * width
+        delta = np.zeros(size, dtype=np.int64)
+        if orders:
+            identities, room_numbers, arrivals, departures = zip(*orders)
+            rows = np.searchsorted(occupancy.numbers, room_numbers) * width
+            first = np.clip(_days(arrivals, start), 0, days)
+            last = np.clip(_days(departures, start), 0, days)
+            inside = first < last
+            delta += np.bincount(rows[inside] + first[inside], minlength=size)
+            delta -= np.bincount(rows[inside] + last[inside], minlength=size)
+            occupancy._orders = {
+                identity: number for identity, number, keep in zip(identities, room_numbers, inside.tolist()) if keep
+            }
+        occupancy.busy = np.cumsum(delta.reshape(-1, width), axis=1)[:, :days] > 0
+        return occupancy
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days)
+
+    def covers(self, arrival: date, departure: date) -> bool:
+        arrival, departure = booking_span(arrival, departure)
+        return self.start <= arrival and departure <= self.end
+
+    def _columns(self, arrival: date, departure: date) -> slice:
+        arrival, departure = booking_span(arrival, departure)
+        first = max((arrival - self.start).days, 0)
+        last = min((departure - self.start).days, self.days)
+        return slice(first, max(first, last))
+
+    def _row(self, number: int) -> int:
+        row = int(np.searchsorted(self.numbers, number))
+        if row == len(self.numbers) or self.numbers[row] != number:
+            raise RoomNotFound(number)
+        return row
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def find_free(self, capacity: int, arrival: date, departure: date) -> List[Tuple[int, int, float]]:
+        """свободные комнаты нужной вместимости (number, capacity, price) по номеру
+
+        Raises:
+            ValueError: даты вне окна матрицы
+        """
+        if not self.covers(arrival, departure):
+            raise ValueError(f"{arrival} - {departure} вне окна {self.start} - {self.end}")
+        columns = self._columns(arrival, departure)
+        with self._lock:
+            free = (self.capacities == capacity) & ~self.busy[:, columns].any(axis=1)
+            rows = np.flatnonzero(free)
+            return list(zip(
+                self.numbers[rows].tolist(), self.capacities[rows].tolist(), self.prices[rows].tolist()
+            ))
+
+    def is_free(self, number: int, arrival: date, departure: date) -> bool:
+        with self._lock:
+            return not self.busy[self._row(number), self._columns(arrival, departure)].any()
+
+    def add_room(self, number: int, capacity: int, price: float):
+        with self._lock:
+            row = int(np.searchsorted(self.numbers, number))
+            if row < len(self.numbers) and self.numbers[row] == number:
+                raise RoomExistError(number)
+            self.numbers = np.insert(self.numbers, row, number)
+            self.capacities = np.insert(self.capacities, row, capacity)
+            self.prices = np.insert(self.prices, row, price)
+            self.busy = np.insert(self.busy, row, False, axis=0)
+
+    def book(self, number: int, identity: int, arrival: date, departure: date):
+        columns = self._columns(arrival, departure)
+        with self._lock:
+            row = self._row(number)
+            if columns.start < columns.stop:
+                self.busy[row, columns] = True
+                self._orders[identity] = number
+
+    def release(self, identity: int, arrival: date, departure: date) -> Optional[int]:
+        """снять бронь, возвращает номер комнаты или None если бронь была вне окна"""
+        with self._lock:
+            number = self._orders.pop(identity, None)
+            if number is not None:
+                self.busy[self._row(number), self._columns(arrival, departure)] = False
+            return number
+
+
+DEFAULT_CALENDAR_DAYS = 30
+MAX_CALENDAR_DAYS = 90
+
+
+class Calendar:
+    """сетка rooms x days: номер брони на каждую ночь, 0 - ночь свободна
+
+    брони одной комнаты не пересекаются, иначе в ячейке остается одна из них
+    """
+
+    def __init__(self, start: date, days: int, rooms: List[Tuple[int, int, float]], grid: np.ndarray):
+        self.start = start
+        self.days = days
+        self.rooms = rooms
+        self.grid = grid
+
+    @classmethod
+    def build(
+            cls, start: date, days: int, rows: Iterable[Tuple[int, int, float, Optional[int], date, date]]
+    ) -> "Calendar":
+        """сетка по строкам (number, capacity, price, identity, arrival, departure) упорядоченным по номеру
+
+        комната без броней - одна строка с identity None,
+        ячейки заполняются без цикла по броням: ночи каждой брони разворачиваются через repeat
+        """
+        rooms, room_rows, orders = [], [], []
+        for number, capacity, price, identity, arrival, departure in rows:
+            if not rooms or rooms[-1][0] != number:
+                rooms.append((number, capacity, price))
+            if identity is not None:
+                room_rows.append(len(rooms) - 1)
+                orders.append((identity,) + booking_span(arrival, departure))
+        grid = np.zeros((len(rooms), days), dtype=np.int64)
+        if orders:
+            identities, arrivals, departures = zip(*orders)
+            first = np.clip(_days(arrivals, start), 0, days)
+            nights = np.clip(_days(departures, start), 0, days) - first
+            nights[nights < 0] = 0
+            offsets = np.arange(nights.sum()) - np.repeat(np.cumsum(nights) - nights, nights)
+            grid[np.repeat(room_rows, nights), np.repeat(first, nights) + offsets] = np.repeat(identities, nights)
+        return cls(start, days, rooms, grid)
+
+    def runs(self) -> List[List[Tuple[int, int]]]:
+        """строки сетки длинами серий: [(номер брони или 0, ночей), ...] на каждую комнату"""
+        if not self.rooms:
+            return []
+        change = np.ones(self.grid.shape, dtype=bool)
+        change[:, 1:] = self.grid[:, 1:] != self.grid[:, :-1]
+        rows, columns = np.nonzero(change)
+        # серия идет до начала следующей серии той же строки или до конца строки
+        ends = np.full(len(columns), self.days)
+        same_row = rows[1:] == rows[:-1]
+        ends[:-1][same_row] = columns[1:][same_row]
+        values = self.grid[rows, columns].tolist()
+        lengths = (ends - columns).tolist()
+        bounds = np.cumsum(np.bincount(rows, minlength=len(self.rooms))).tolist()
+        res, position = [], 0
+        for bound in bounds:
+            res.append(list(zip(values[position:bound], lengths[position:bound])))
+            position = bound
+        return res
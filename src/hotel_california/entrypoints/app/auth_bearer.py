@@ -1,10 +1,9 @@
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 
-from hotel_california.domain.models import AUDIENCE, LOGIN_URL
-from hotel_california.entrypoints.app.workers import get_user_worker
-from hotel_california.service_layer.service.hotel import check_is_admin, decode_token
-from hotel_california.service_layer.unit_of_work import UOW
+from hotel_california.domain.models import AUDIENCE, LOGIN_URL, ROLE_ADMIN
+from hotel_california.service_layer.exceptions import UserNotAdmin
+from hotel_california.service_layer.service.hotel import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=LOGIN_URL)
 
@@ -21,10 +20,8 @@ async def validate_refresh_token(token: str = Depends(oauth2_scheme)) -> dict:
     return payload
 
 
-async def check_admin(
-    payload: str = Depends(validate_token),
-    worker: UOW = Depends(get_user_worker),
-) -> dict:
-    """проверка пользователя на админ"""
-    email: str = payload.get("sub")
-    check_is_admin(email=email, workers=worker)
+async def check_admin(payload: dict = Depends(validate_token)) -> dict:
+    """проверка пользователя на админ по роли в токене, без запроса к бд"""
+    if payload.get("role") != ROLE_ADMIN:
+        raise UserNotAdmin(email=payload.get("sub"))
+    return payload
@@ -1,13 +1,18 @@
+import time
 from abc import ABC
 
 from starlette.authentication import (
     AuthCredentials, AuthenticationBackend, AuthenticationError, SimpleUser, BaseUser, UnauthenticatedUser
 )
 
-from hotel_california.adapters.repository import UserRepository
-from hotel_california.adapters.sqlalchemy_init import SessionLocal
-from hotel_california.service_layer.service.hotel import decode_token, get_user_by_email
-from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+from hotel_california.domain.models import ROLE_ADMIN
+from hotel_california.entrypoints.app.services import get_user_by_email
+from hotel_california.entrypoints.app.workers import new_user_worker
+from hotel_california.service_layer.cache import principal_cache
+from hotel_california.service_layer.service.hotel import decode_token
+
+# статика отдается без авторизации и без похода в бд
+SKIP_AUTH_PREFIXES = ("/static",)
 
 
 class User(BaseUser, ABC):
@@ -39,19 +44,34 @@ class SessionAuthBackend(AuthenticationBackend):
         if "Authorization" in conn.headers:
             # пропускаю чтобы работала JWT
             return
+        if conn.url.path.startswith(SKIP_AUTH_PREFIXES):
+            return
         cookie_authorization: str = conn.cookies.get("Authorization")
         if cookie_authorization:
             _, token = cookie_authorization.split(" ")
-            credentials = decode_token(token)
-            email = credentials['sub']
-            session = SessionLocal()
-            worker = SqlAlchemyUOW(repo=UserRepository, session=session)
-            user = get_user_by_email(email, workers=worker)
-            print(cookie_authorization)
+            user = principal_cache.get(token)
+            if user is None:
+                user = await self._load_user(token)
 
             if user.is_admin:
-                return AuthCredentials(["authenticated", "admin"]), User(email, is_admin=user.is_admin)
+                return AuthCredentials(["authenticated", "admin"]), user
             else:
-                return AuthCredentials(["authenticated"]), User(email, is_admin=user.is_admin)
+                return AuthCredentials(["authenticated"]), user
         else:
             return
+
+    @staticmethod
+    async def _load_user(token: str) -> User:
+        """проверка токена, результат кэшируется до истечения токена
+
+        роль берется из claim, в бд идем только для токенов без роли
+        """
+        credentials = decode_token(token)
+        email = credentials['sub']
+        if "role" in credentials:
+            user = User(email, is_admin=credentials["role"] == ROLE_ADMIN)
+        else:
+            db_user = await get_user_by_email(email, workers=new_user_worker())
+            user = User(email, is_admin=db_user.is_admin)
+        principal_cache.set(token, user, ttl=credentials["exp"] - time.time())
+        return user
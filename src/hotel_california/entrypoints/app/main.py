@@ -6,13 +6,17 @@ from starlette.middleware.authentication import AuthenticationMiddleware
 
 from hotel_california.config import get_settings
 from hotel_california.entrypoints.app.auth_bearer import validate_token
+from hotel_california.entrypoints.app.metrics import MetricsMiddleware
 from hotel_california.entrypoints.app.routers.admin import admin_router
 from hotel_california.entrypoints.app.routers.auth import auth_router
+from hotel_california.entrypoints.app.routers.export import export_router
+from hotel_california.entrypoints.app.routers.metrics import metrics_router
 from hotel_california.entrypoints.app.routers.rooms import rooms_router
 from hotel_california.entrypoints.app.routers.users import users_router
 from hotel_california.service_layer.exceptions import (
     AuthenticationError,
     BusinessLogicError,
+    ServiceBusy,
 )
 from hotel_california.entrypoints.app.auth_session import SessionAuthBackend
 
@@ -27,12 +31,16 @@ app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 app.add_middleware(
     AuthenticationMiddleware, backend=SessionAuthBackend()
 )
+# внешний слой, чтобы учитывать и запросы к бд из авторизации
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(rooms_router)
 app.include_router(admin_router)
+app.include_router(export_router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(BusinessLogicError)
@@ -59,6 +67,15 @@ async def authentication_exception_handler(request, exc):
     )
 
 
+@app.exception_handler(ServiceBusy)
+async def service_busy_exception_handler(request, exc: ServiceBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Error! ServiceBusy", "body": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/test")
 async def test():
     return {"message": "Hello World"}
@@ -0,0 +1,301 @@
+"""метрики приложения в текстовом формате prometheus
+
+латентность, статусы и запросы в работе по шаблону маршрута,
+число запросов к бд и время в бд на каждый http запрос,
+счетчики кэшей процесса
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from hotel_california.adapters.sqlalchemy_init import statement_scope
+from hotel_california.service_layer.cache import principal_cache, search_cache, token_cache
+from hotel_california.service_layer.catalog import room_catalog
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# маршрут для путей которые не совпали ни с одним роутом, чтобы не плодить метки
+UNMATCHED = "<unmatched>"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels: LabelValues = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: LabelValues = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # по меткам: счетчики по корзинам (последняя +Inf), сумма, количество
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: LabelValues = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, labels: LabelValues = ()) -> int:
+        counts, _ = self._values.get(labels, ([0], [0.0]))
+        return sum(counts)
+
+    def samples(self) -> List[str]:
+        res = []
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                res.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            res.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            res.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return res
+
+
+class Collected(Metric):
+    """значения читаются функцией collect в момент отдачи метрик, например счетчики кэшей"""
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labels: Tuple[str, ...],
+            collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+            kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> List[str]:
+        items = sorted(self._collect())
+        return [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP запросы по маршруту и статусу", ("method", "route", "status")
+))
+LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "латентность HTTP запросов", ("method", "route")
+))
+IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP запросы в работе", ("method", "route")
+))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "запросы к бд по маршруту", ("method", "route")
+))
+DB_TIME = registry.register(Counter(
+    "db_query_duration_seconds_total", "время в бд по маршруту", ("method", "route")
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "db_queries_per_request", "число запросов к бд на один HTTP запрос", ("method", "route"),
+    buckets=QUERY_BUCKETS,
+))
+
+CACHES = {
+    "principal": principal_cache,
+    "token": token_cache,
+    "search": search_cache,
+    "room_catalog": room_catalog,
+}
+
+
+def _cache_stat(field: str) -> Callable[[], List[Tuple[LabelValues, float]]]:
+    """значение поля stats по каждому кэшу, у которого оно есть"""
+    def collect():
+        stats = ((name, cache.stats) for name, cache in CACHES.items())
+        return [((name,), values[field]) for name, values in stats if field in values]
+    return collect
+
+
+def _cache_hit_ratio() -> List[Tuple[LabelValues, float]]:
+    res = []
+    for name, cache in CACHES.items():
+        stats = cache.stats
+        lookups = stats["hits"] + stats["misses"]
+        res.append(((name,), stats["hits"] / lookups if lookups else 0.0))
+    return res
+
+
+CACHE_HITS = registry.register(Collected(
+    "cache_hits_total", "попадания в кэш", ("cache",), _cache_stat("hits"), kind="counter"
+))
+CACHE_MISSES = registry.register(Collected(
+    "cache_misses_total", "промахи кэша", ("cache",), _cache_stat("misses"), kind="counter"
+))
+CACHE_INVALIDATIONS = registry.register(Collected(
+    "cache_invalidations_total", "записи сброшенные после изменений", ("cache",), _cache_stat("invalidations"),
+    kind="counter",
+))
+CACHE_EVICTIONS = registry.register(Collected(
+    "cache_evictions_total", "записи вытесненные по размеру", ("cache",), _cache_stat("evictions"), kind="counter"
+))
+CACHE_SIZE = registry.register(Collected(
+    "cache_size", "записей в кэше", ("cache",), _cache_stat("size")
+))
+CACHE_HIT_RATIO = registry.register(Collected(
+    "cache_hit_ratio", "доля попаданий в кэш с запуска процесса", ("cache",), _cache_hit_ratio
+))
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    duration: float = 0.0
+
+
+# учет запросов к бд текущего http запроса, пул потоков копирует контекст,
+# поэтому синхронные сервисы пишут в тот же объект
+current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("current_db_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += time.perf_counter() - start
+
+
+def route_template(scope: Scope) -> str:
+    """шаблон пути (/rooms/{num}/booking) вместо самого пути, чтобы метки не зависели от параметров"""
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """ASGI middleware, должен быть внешним чтобы учитывать и запросы к бд из других middleware
+
+    заодно задает границы запроса для предупреждений о N+1 в sqlalchemy_init
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], route_template(scope))
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestDbStats()
+        token = current_db_stats.set(stats)
+        IN_PROGRESS.inc(labels)
+        start = time.perf_counter()
+        try:
+            with statement_scope():
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            LATENCY.observe(time.perf_counter() - start, labels)
+            IN_PROGRESS.dec(labels)
+            REQUESTS.inc(labels + (str(status),))
+            DB_QUERIES.inc(labels, stats.queries)
+            DB_TIME.inc(labels, stats.duration)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, labels)
+            current_db_stats.reset(token)
@@ -0,0 +1,29 @@
+"""параметры постраничного вывода и ссылки на следующую страницу"""
+from typing import Optional
+
+from fastapi import Query, Request
+
+from hotel_california.adapters.repository import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page
+
+
+class PageParams:
+    """?after=<курсор>&limit=<размер>, курсор - номер комнаты, номер брони или id пользователя"""
+
+    def __init__(
+        self,
+        after: Optional[int] = Query(None, description="курсор: последний ключ предыдущей страницы"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.after = after
+        self.limit = limit
+
+
+def next_page_url(request: Request, page: Page, params: PageParams) -> Optional[str]:
+    if page.next is None:
+        return None
+    return str(request.url.include_query_params(after=page.next, limit=params.limit))
+
+
+def link_header(url: Optional[str]) -> dict:
+    """заголовок Link (RFC 8288) для json ответов, тело ответа остается списком"""
+    return {"Link": f'<{url}>; rel="next"'} if url else {}
@@ -0,0 +1,30 @@
+"""быстрый путь json ответов: orjson прямо из кортежей проекций
+
+обычный путь fastapi - валидация response_model и jsonable_encoder на каждую строку,
+здесь строка превращается в dict заранее собранной функцией и сразу кодируется orjson.
+схемы в response_model остаются для OpenAPI, роутер включает путь через
+APIRouter(default_response_class=FastJSONResponse) и возвращает rows_response(...)
+"""
+from operator import itemgetter
+from typing import Callable, Iterable, NamedTuple, Optional, Sequence, Type
+
+from fastapi.responses import ORJSONResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson сам кодирует date/datetime, dict и list без промежуточных копий"""
+
+
+def row_serializer(row_type: Type[NamedTuple], fields: Optional[Sequence[str]] = None) -> Callable[[tuple], dict]:
+    """функция строка -> dict только с полями fields, индексы полей вычисляются один раз"""
+    names = tuple(fields or row_type._fields)
+    indexes = [row_type._fields.index(name) for name in names]
+    if len(indexes) == 1:
+        name, index = names[0], indexes[0]
+        return lambda row: {name: row[index]}
+    getter = itemgetter(*indexes)
+    return lambda row: dict(zip(names, getter(row)))
+
+
+def rows_response(rows: Iterable[tuple], serializer: Callable[[tuple], dict], **kwargs) -> FastJSONResponse:
+    return FastJSONResponse(content=[serializer(row) for row in rows], **kwargs)
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Request, Response, Depends, status
+import logging
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, Response, Depends, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from starlette.authentication import requires
 
 from hotel_california.config import get_settings
+from hotel_california.domain.occupancy import DEFAULT_CALENDAR_DAYS, MAX_CALENDAR_DAYS
+from hotel_california.entrypoints.app.pagination import PageParams, next_page_url
 from hotel_california.entrypoints.app.forms import LoginForm, RoomForm, DatesForm, UserForm
 from hotel_california.entrypoints.app.workers import get_user_worker, get_room_worker, get_order_worker
-from hotel_california.service_layer.service.hotel import get_access_token, get_rooms, add_room, get_room_orders, \
-    booking, delete_order, add_user, get_users
+from hotel_california.entrypoints.app.services import get_access_token, get_rooms, add_room, get_room_orders, \
+    booking, delete_order, add_user, get_users, get_calendar
 from hotel_california.service_layer.unit_of_work import UOW
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
+
 TEMPLATE_DIR = str(settings.PATHS.fastapi_folder.joinpath(settings.PATHS.template_dir))
 templates = Jinja2Templates(directory=TEMPLATE_DIR)
 
@@ -35,10 +43,8 @@ async def login(request: Request, worker: UOW = Depends(get_user_worker)):
 
     if request.method == 'POST' and form.validate():
         response = RedirectResponse(url="/admin/rooms", status_code=status.HTTP_303_SEE_OTHER)
-        token = get_access_token(form.email.data, form.password.data, workers=worker)
-        print("Успех")
-        print(form.email.data)
-        print(form.password.data)
+        token = await get_access_token(form.email.data, form.password.data, workers=worker)
+        logger.info("admin login %s", form.email.data)
         response.set_cookie(
             key="Authorization",
             value=f"Bearer {token}",
@@ -48,7 +54,8 @@ async def login(request: Request, worker: UOW = Depends(get_user_worker)):
             expires=1800,
         )
         return response
-    print(form.errors)
+    if form.errors:
+        logger.info("admin login form errors %s", form.errors)
     return templates.TemplateResponse("login.html", {"request": request, 'form': form})
 
 
@@ -63,12 +70,36 @@ async def logout(request: Request, response: Response):
 
 @admin_router.get("/admin/rooms")
 @requires(['authenticated'])
-async def rooms_endpoint(request: Request, worker: UOW = Depends(get_room_worker)):
-    """Список комнат
+async def rooms_endpoint(request: Request, params: PageParams = Depends(), worker: UOW = Depends(get_room_worker)):
+    """Список комнат по номеру, постранично
+    """
+    page = await get_rooms(workers=worker, after=params.after, limit=params.limit)
+    return templates.TemplateResponse(
+        "rooms.html", {"request": request, 'rooms': page.items, 'next_url': next_page_url(request, page, params)}
+    )
+
+
+@admin_router.get("/admin/calendar")
+@requires(['authenticated'])
+async def calendar_endpoint(request: Request, date_from: Optional[date] = None,
+                            days: int = Query(DEFAULT_CALENDAR_DAYS, ge=1, le=MAX_CALENDAR_DAYS),
+                            worker: UOW = Depends(get_room_worker)):
+    """Календарь занятости всех комнат, по умолчанию с сегодня
     """
-    rooms = get_rooms(workers=worker)
-    rooms = sorted(rooms, key=lambda x: x.number)
-    return templates.TemplateResponse("rooms.html", {"request": request, 'rooms': rooms})
+    date_from = date_from or date.today()
+    calendar = await get_calendar(date_from, days, workers=worker)
+    dates = [date_from + timedelta(days=i) for i in range(days)]
+
+    def window_url(start: date) -> str:
+        return str(request.url.include_query_params(date_from=start, days=days))
+
+    return templates.TemplateResponse("calendar.html", {
+        "request": request,
+        "rooms": list(zip(calendar.rooms, calendar.runs())),
+        "dates": dates,
+        "prev_url": window_url(date_from - timedelta(days=days)),
+        "next_url": window_url(date_from + timedelta(days=days)),
+    })
 
 
 @admin_router.get("/admin/rooms/add")
@@ -81,30 +112,33 @@ async def room_add_endpoint(request: Request, worker: UOW = Depends(get_room_wor
     """
     form = RoomForm(await request.form())
     if request.method == 'POST' and form.validate():
-        add_room(form.number.data, form.capacity.data, form.price.data, workers=worker)
+        await add_room(form.number.data, form.capacity.data, form.price.data, workers=worker)
         return RedirectResponse(url="/admin/rooms", status_code=status.HTTP_303_SEE_OTHER)
     return templates.TemplateResponse("add_room.html", {"request": request, 'form': form})
 
 
 @admin_router.get("/admin/rooms/{num}/orders")
 @requires(['authenticated'])
-async def room_get_orders_endpoint(request: Request, num: int, worker: UOW = Depends(get_room_worker)):
-    """Список ордеров комнаты
+async def room_get_orders_endpoint(request: Request, num: int, params: PageParams = Depends(),
+                                   worker: UOW = Depends(get_room_worker)):
+    """Список ордеров комнаты по номеру брони, постранично
     """
-    orders = get_room_orders(num, worker)
-    return templates.TemplateResponse("orders.html", {"request": request, 'orders': orders})
+    page = await get_room_orders(num, worker, after=params.after, limit=params.limit)
+    return templates.TemplateResponse(
+        "orders.html", {"request": request, 'orders': page.items, 'next_url': next_page_url(request, page, params)}
+    )
 
 
 @admin_router.get("/admin/rooms/{num}/orders/add")
 @admin_router.post("/admin/rooms/{num}/orders/add")
 @requires(['authenticated'])
-async def room_add_order_endpoint(request: Request, num: int, room_worker: UOW = Depends(get_room_worker), order_worker: UOW = Depends(get_order_worker)):
+async def room_add_order_endpoint(request: Request, num: int, room_worker: UOW = Depends(get_room_worker)):
     """Забронировать номер
 
     (указываем номер, дата заезда, дата отъезда, возвращаем номер брони)"""
     form = DatesForm(await request.form())
     if request.method == 'POST' and form.validate():
-        booking(num, form.arrival.data, form.departure.data, room_worker, order_worker)
+        await booking(num, form.arrival.data, form.departure.data, room_worker)
         return RedirectResponse(url="/admin/rooms", status_code=status.HTTP_303_SEE_OTHER)
     return templates.TemplateResponse("add_order.html", {"request": request, 'form': form})
 
@@ -122,17 +156,19 @@ async def booking_cancel_endpoint(request: Request, order_id: int, order_worker:
     Returns:
 
     """
-    delete_order(order_id, order_worker)
+    await delete_order(order_id, order_worker)
     return RedirectResponse(url="/admin/rooms", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @admin_router.get("/admin/users")
 @requires(['authenticated', 'admin'])
-async def users_endpoint(request: Request, worker: UOW = Depends(get_user_worker)):
-    """Список пользователей
+async def users_endpoint(request: Request, params: PageParams = Depends(), worker: UOW = Depends(get_user_worker)):
+    """Список пользователей, постранично
     """
-    users = get_users(workers=worker)
-    return templates.TemplateResponse("users.html", {"request": request, 'users': users})
+    page = await get_users(workers=worker, after=params.after, limit=params.limit)
+    return templates.TemplateResponse(
+        "users.html", {"request": request, 'users': page.items, 'next_url': next_page_url(request, page, params)}
+    )
 
 
 @admin_router.get("/admin/users/add")
@@ -142,6 +178,6 @@ async def user_add_endpoint(request: Request, worker: UOW = Depends(get_user_wor
     """Добавление пользователя"""
     form = UserForm(await request.form())
     if request.method == 'POST' and form.validate():
-        add_user(form.name.data, form.email.data, form.password.data, form.is_admin.data, workers=worker)
+        await add_user(form.name.data, form.email.data, form.password.data, form.is_admin.data, workers=worker)
         return RedirectResponse(url="/admin/users", status_code=status.HTTP_303_SEE_OTHER)
     return templates.TemplateResponse("add_user.html", {"request": request, 'form': form})
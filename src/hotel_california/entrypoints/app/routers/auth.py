@@ -3,7 +3,7 @@ from fastapi import APIRouter, Body, Depends
 from hotel_california.entrypoints.app.auth_bearer import validate_refresh_token
 from hotel_california.entrypoints.app.serializers import TokenResponse, UserLoginSchema
 from hotel_california.entrypoints.app.workers import get_user_worker, get_db
-from hotel_california.service_layer.service.hotel import login_user_and_get_tokens, refresh_token
+from hotel_california.entrypoints.app.services import login_user_and_get_tokens, refresh_token
 from hotel_california.service_layer.unit_of_work import UOW
 
 auth_router = APIRouter()
@@ -13,7 +13,7 @@ auth_router = APIRouter()
 async def user_login_endpoint(
     data: UserLoginSchema = Body(...), worker: UOW = Depends(get_user_worker)
 ):
-    access, refresh = login_user_and_get_tokens(**data.dict(), workers=worker)
+    access, refresh = await login_user_and_get_tokens(**data.dict(), workers=worker)
     return TokenResponse(access=access, refresh=refresh)
 
 
@@ -23,5 +23,5 @@ async def refresh_token_endpoint(
     worker: UOW = Depends(get_user_worker),
 ):
     email: str = payload.get("sub")
-    access, refresh = refresh_token(email, workers=worker)
+    access, refresh = await refresh_token(email, workers=worker)
     return TokenResponse(access=access, refresh=refresh)
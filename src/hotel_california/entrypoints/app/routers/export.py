@@ -0,0 +1,33 @@
+from datetime import date
+from enum import Enum
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from hotel_california.entrypoints.app.auth_bearer import check_admin
+from hotel_california.entrypoints.app.services import export_orders
+from hotel_california.entrypoints.app.workers import get_order_worker
+from hotel_california.service_layer.export import MEDIA_TYPES
+from hotel_california.service_layer.unit_of_work import UOW
+
+export_router = APIRouter()
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+@export_router.get("/export/orders", dependencies=[Depends(check_admin)])
+async def export_orders_endpoint(date_from: date, date_to: date, format: ExportFormat = ExportFormat.ndjson,
+                                 order_worker: UOW = Depends(get_order_worker)):
+    """Выгрузка броней, пересекающихся с периодом [date_from, date_to)
+
+    только админ, ответ идет потоком из серверного курсора бд"""
+    chunks = export_orders(date_from, date_to, format.value, order_worker)
+    filename = f"orders_{date_from}_{date_to}.{format.value}"
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format.value],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
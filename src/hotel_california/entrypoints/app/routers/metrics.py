@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from hotel_california.entrypoints.app.metrics import CONTENT_TYPE, registry
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """метрики в текстовом формате prometheus"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
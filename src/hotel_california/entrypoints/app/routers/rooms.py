@@ -1,57 +1,76 @@
-from dataclasses import asdict
 from datetime import date
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import JSONResponse
 
-from hotel_california.domain.models import Room, Order
+from hotel_california.adapters.repository import OrderView, RoomView
+from hotel_california.domain.occupancy import DEFAULT_CALENDAR_DAYS, MAX_CALENDAR_DAYS, Calendar
 from hotel_california.entrypoints.app.auth_bearer import validate_token
-from hotel_california.entrypoints.app.serializers import RoomAddForm, RoomResponse, OrderResponse
+from hotel_california.entrypoints.app.pagination import PageParams, link_header, next_page_url
+from hotel_california.entrypoints.app.responses import FastJSONResponse, row_serializer, rows_response
+from hotel_california.entrypoints.app.serializers import RoomAddForm, RoomResponse, OrderResponse, CalendarResponse
 from hotel_california.entrypoints.app.workers import get_room_worker, get_order_worker
-from hotel_california.service_layer.service.hotel import add_room, find_rooms, check_room, create_order, \
-    get_order_by_id, get_room_by_num, delete_order, get_room_orders, booking
+from hotel_california.entrypoints.app.services import add_room, find_rooms, get_order_by_id, delete_order, \
+    get_room_orders, booking, get_calendar
 from hotel_california.service_layer.unit_of_work import UOW
 
-rooms_router = APIRouter()
+# json маршруты роутера отдают проекции через orjson, минуя валидацию response_model
+rooms_router = APIRouter(default_response_class=FastJSONResponse)
 
+room_serializer = row_serializer(RoomView)
+order_serializer = row_serializer(OrderView)
+order_dates_serializer = row_serializer(OrderView, ("arrival", "departure"))
 
-def convert_order(order: Order) -> dict:
-    res = {"identity": order.identity}
-    for i in order.dates:
-        res[i.status] = i.date
-    return res
+
+def calendar_content(calendar: Calendar) -> dict:
+    return {
+        "date_from": calendar.start,
+        "days": calendar.days,
+        "rooms": [
+            {"number": number, "capacity": capacity, "price": price, "runs": runs}
+            for (number, capacity, price), runs in zip(calendar.rooms, calendar.runs())
+        ],
+    }
 
 
 @rooms_router.post("/rooms", dependencies=[Depends(validate_token)])
 async def add_room_endpoint(room: RoomAddForm, worker: UOW = Depends(get_room_worker)):
-    number = add_room(**room.dict(), workers=worker)
+    number = await add_room(**room.dict(), workers=worker)
     return JSONResponse(
         status_code=201,
         content={"room_num": number},
     )
 
 
-@rooms_router.get("/rooms", dependencies=[Depends(validate_token)],
-                  response_model=List[RoomResponse],
-                  response_model_exclude={"orders"})
+@rooms_router.get("/rooms", dependencies=[Depends(validate_token)], response_model=List[RoomResponse])
 async def find_rooms_endpoint(cap: int, arrival: date, departure: date, worker: UOW = Depends(get_room_worker)):
     """Поиск номера
 
     (указываем даты и количество мест,
     возвращаем список (номер, вместительность, цена)"""
-    res: List[Room] = find_rooms(cap, arrival, departure, workers=worker)
-    return [asdict(i) for i in res]
+    res: List[RoomView] = await find_rooms(cap, arrival, departure, workers=worker)
+    return rows_response(res, room_serializer)
+
+
+@rooms_router.get("/rooms/calendar", dependencies=[Depends(validate_token)], response_model=CalendarResponse)
+async def calendar_endpoint(date_from: date, days: int = Query(DEFAULT_CALENDAR_DAYS, ge=1, le=MAX_CALENDAR_DAYS),
+                            worker: UOW = Depends(get_room_worker)):
+    """Календарь занятости
+
+    (все комнаты на days ночей начиная с date_from, ночи комнаты сериями
+    [номер брони или 0 если свободно, число ночей])"""
+    calendar = await get_calendar(date_from, days, workers=worker)
+    return FastJSONResponse(content=calendar_content(calendar))
 
 
 @rooms_router.get("/rooms/{num}/booking", dependencies=[Depends(validate_token)])
 async def booking_room_endpoint(num: int, arrival: date, departure: date,
-                                room_worker: UOW = Depends(get_room_worker),
-                                order_worker: UOW = Depends(get_order_worker)):
+                                room_worker: UOW = Depends(get_room_worker)):
     """Забронировать номер
 
     (указываем номер, дата заезда, дата отъезда, возвращаем номер брони)"""
-    identity = booking(num, arrival, departure, room_worker, order_worker)
+    identity = await booking(num, arrival, departure, room_worker)
     return JSONResponse(
         status_code=200,
         content={"order_id": identity},
@@ -59,11 +78,14 @@ async def booking_room_endpoint(num: int, arrival: date, departure: date,
 
 
 @rooms_router.get("/rooms/{num}/orders", dependencies=[Depends(validate_token)], response_model=List[OrderResponse])
-async def get_bookings_endpoint(num: int, room_worker: UOW = Depends(get_room_worker)):
+async def get_bookings_endpoint(num: int, request: Request,
+                                params: PageParams = Depends(), room_worker: UOW = Depends(get_room_worker)):
     """Показать даты на которые забронирована комната
 
-    (указываем номер комнаты, возвращаем список броней"""
-    return get_room_orders(num, room_worker)
+    (указываем номер комнаты, возвращаем список броней по номеру брони,
+    ссылка на следующую страницу в заголовке Link)"""
+    page = await get_room_orders(num, room_worker, after=params.after, limit=params.limit)
+    return rows_response(page.items, order_serializer, headers=link_header(next_page_url(request, page, params)))
 
 
 @rooms_router.get("/orders/{order_id}", dependencies=[Depends(validate_token)], response_model=OrderResponse,
@@ -73,8 +95,8 @@ async def get_order_endpoint(order_id: int, order_worker: UOW = Depends(get_orde
 
     (указываем номер брони, возвращаем дату заезда и дату отъезда)
     """
-    res = get_order_by_id(order_id, order_worker)
-    return res
+    res = await get_order_by_id(order_id, order_worker)
+    return FastJSONResponse(content=order_dates_serializer(res))
 
 
 @rooms_router.get("/orders/{order_id}/cancel", dependencies=[Depends(validate_token)])
@@ -82,7 +104,7 @@ async def booking_cancel_endpoint(order_id: int, order_worker: UOW = Depends(get
     """Снять бронь с номера
 55755
     (указываем номер брони,"""
-    delete_order(order_id, order_worker)
+    await delete_order(order_id, order_worker)
     return JSONResponse(
         status_code=204
     )
@@ -1,4 +1,5 @@
 from datetime import datetime, date
+from typing import List, Tuple
 
 from pydantic import BaseModel, EmailStr, PositiveInt, PositiveFloat
 
@@ -47,3 +48,13 @@ class OrderResponse(BaseModel):
     arrival: date
     departure: date
 
+
+class CalendarRoom(RoomResponse):
+    # серии ночей: [номер брони или 0 если свободно, число ночей]
+    runs: List[Tuple[int, int]]
+
+
+class CalendarResponse(BaseModel):
+    date_from: date
+    days: int
+    rooms: List[CalendarRoom]
@@ -0,0 +1,48 @@
+"""сервисные функции для роутеров, всегда awaitable
+
+в async режиме (settings.DB.async_mode) - версии из hotel_async на AsyncSession,
+иначе синхронные из hotel, которые выполняются в пуле потоков
+и не блокируют event loop на запросах к бд
+"""
+from functools import wraps
+
+from starlette.concurrency import run_in_threadpool
+
+from hotel_california.config import get_settings
+from hotel_california.service_layer.service import hotel, hotel_async
+
+settings = get_settings()
+
+
+def _select(name: str):
+    if settings.DB.async_mode:
+        return getattr(hotel_async, name)
+
+    func = getattr(hotel, name)
+
+    @wraps(func)
+    async def wrapped(*args, **kwargs):
+        return await run_in_threadpool(func, *args, **kwargs)
+
+    return wrapped
+
+
+add_user = _select("add_user")
+get_user_by_email = _select("get_user_by_email")
+get_users = _select("get_users")
+login_user_and_get_tokens = _select("login_user_and_get_tokens")
+get_access_token = _select("get_access_token")
+refresh_token = _select("refresh_token")
+add_room = _select("add_room")
+get_order_by_id = _select("get_order_by_id")
+find_rooms = _select("find_rooms")
+get_calendar = _select("get_calendar")
+get_room_by_num = _select("get_room_by_num")
+get_rooms = _select("get_rooms")
+get_room_orders = _select("get_room_orders")
+delete_order = _select("delete_order")
+booking = _select("booking")
+
+# выгрузка возвращает итератор (асинхронный в async режиме) для StreamingResponse,
+# синхронный итератор starlette сам читает в пуле потоков
+export_orders = getattr(hotel_async if settings.DB.async_mode else hotel, "export_orders")
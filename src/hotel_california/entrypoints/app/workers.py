@@ -1,28 +1,56 @@
 from fastapi import Depends
 
+from hotel_california.adapters.async_repository import (
+    AsyncOrderRepository,
+    AsyncRoomRepository,
+    AsyncUserRepository,
+)
 from hotel_california.adapters.orm import start_mappers
 from hotel_california.adapters.repository import UserRepository, RoomRepository, OrderRepository
-from hotel_california.adapters.sqlalchemy_init import SessionLocal
-from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+from hotel_california.adapters.sqlalchemy_init import SessionLocal, AsyncSessionLocal
+from hotel_california.config import get_settings
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW, AsyncSqlAlchemyUOW
+
+settings = get_settings()
 
 start_mappers()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+if settings.DB.async_mode:
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+else:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def _get_worker(repo, async_repo, session):
+    if settings.DB.async_mode:
+        return AsyncSqlAlchemyUOW(repo=async_repo, session=session)
+    return SqlAlchemyUOW(repo=repo, session=session)
 
 
 def get_user_worker(session=Depends(get_db)):
-    return SqlAlchemyUOW(repo=UserRepository, session=session)
+    return _get_worker(UserRepository, AsyncUserRepository, session)
 
 
 def get_room_worker(session=Depends(get_db)):
-    return SqlAlchemyUOW(repo=RoomRepository, session=session)
+    return _get_worker(RoomRepository, AsyncRoomRepository, session)
 
 
 def get_order_worker(session=Depends(get_db)):
-    return SqlAlchemyUOW(repo=OrderRepository, session=session)
+    return _get_worker(OrderRepository, AsyncOrderRepository, session)
+
+
+def new_user_worker():
+    """воркер со своей сессией для кода вне зависимостей fastapi (middleware)
+
+    сессия закрывается при выходе из воркера
+    """
+    session = AsyncSessionLocal() if settings.DB.async_mode else SessionLocal()
+    return _get_worker(UserRepository, AsyncUserRepository, session)
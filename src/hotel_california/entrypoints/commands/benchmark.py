@@ -0,0 +1,354 @@
+"""бенчмарки горячих путей домена и сервисов на синтетическом отеле
+
+    python -m hotel_california.entrypoints.commands.benchmark --rooms 100,1000,10000 --output bench.json
+    python -m hotel_california.entrypoints.commands.benchmark --compare old.json new.json
+
+каждый размер отеля проверяется в памяти (доменные менеджеры), на sqlite
+и на сериализации json ответов (путь fastapi по умолчанию против orjson),
+результаты сохраняются в json для сравнения между коммитами
+
+бэкенд memory меряет доменные менеджеры напрямую, а не сервисы поверх
+FakeDb/FakeUnitOfWork: FakeDb умеет только общие get(reference)/filter/all и не
+реализует методы репозиториев, которые вызывают сервисы (find_free, get_view,
+occupancy_rows, catalog_version, next_order_identity, ...). поверх него сервисы
+все равно свелись бы к тем же RoomManager/OrderManager/UserManager
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from hotel_california.adapters.orm import metadata_obj, order, rooms, start_mappers
+from hotel_california.adapters.repository import OrderRepository, OrderView, RoomRepository, RoomView
+from hotel_california.domain.models import (
+    BookingDate,
+    Order,
+    OrderManager,
+    Room,
+    RoomManager,
+    Status,
+    User,
+    UserManager,
+)
+from hotel_california.domain.occupancy import OccupancyMap
+from hotel_california.entrypoints.app.responses import row_serializer, rows_response
+from hotel_california.entrypoints.app.serializers import OrderResponse, RoomResponse
+from hotel_california.service_layer.cache import search_cache
+from hotel_california.service_layer.catalog import room_catalog
+from hotel_california.service_layer.service import hotel
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+start_mappers()
+
+CAPACITIES = 4
+# брони начинаются позже чем через 3 дня, чтобы их можно было отменить
+START = date.today() + timedelta(days=10)
+NIGHTS = 2
+OCCUPANCY_DAYS = 365
+
+
+class Hotel:
+    """синтетический отель: комнаты по кругу вместимостью 1..CAPACITIES,
+    у каждой комнаты bookings броней по NIGHTS ночей через день
+    """
+
+    def __init__(self, rooms_count: int, bookings: int):
+        self.rooms_count = rooms_count
+        self.bookings = bookings
+
+    def booking_dates(self, index: int):
+        arrival = START + timedelta(days=index * (NIGHTS + 1))
+        return arrival, arrival + timedelta(days=NIGHTS)
+
+    @property
+    def free_dates(self):
+        """даты между бронями, свободные во всех комнатах"""
+        arrival = START + timedelta(days=NIGHTS)
+        return arrival, arrival + timedelta(days=1)
+
+    @property
+    def busy_dates(self):
+        return self.booking_dates(0)
+
+    @property
+    def orders_count(self) -> int:
+        return self.rooms_count * self.bookings
+
+    def room_rows(self) -> List[dict]:
+        return [
+            {"id": number, "number": number, "capacity": number % CAPACITIES + 1, "price": 100.0}
+            for number in range(1, self.rooms_count + 1)
+        ]
+
+    def order_rows(self) -> List[dict]:
+        res = []
+        identity = 0
+        for number in range(1, self.rooms_count + 1):
+            for index in range(self.bookings):
+                identity += 1
+                arrival, departure = self.booking_dates(index)
+                res.append({
+                    "room_id": number, "identity": identity, "arrival": arrival, "departure": departure
+                })
+        return res
+
+    def domain_rooms(self) -> List[Room]:
+        res = []
+        identity = 0
+        for row in self.room_rows():
+            orders = []
+            for index in range(self.bookings):
+                identity += 1
+                arrival, departure = self.booking_dates(index)
+                orders.append(Order(identity=identity, arrival=arrival, departure=departure))
+            res.append(Room(row["number"], row["capacity"], row["price"], orders=orders))
+        return res
+
+
+def parse_dates(arrival: date, departure: date):
+    return BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE)
+
+
+def measure(func: Callable, repeat: int, setup: Callable = None) -> Dict[str, float]:
+    """время в секундах, setup вызывается перед каждым замером и не учитывается"""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def measure_cached(func: Callable, repeat: int) -> Dict[str, float]:
+    """время повторных вызовов, первый вызов заполняет кэш и не учитывается"""
+    func()
+    return measure(func, repeat)
+
+
+def bench_memory(hotel_data: Hotel, repeat: int) -> Dict[str, dict]:
+    domain_rooms = hotel_data.domain_rooms()
+    free = parse_dates(*hotel_data.free_dates)
+    busy = parse_dates(*hotel_data.busy_dates)
+
+    def init_rooms():
+        return RoomManager({room.number: room for room in domain_rooms})
+
+    manager = init_rooms()
+
+    def build_indexes(manager):
+        for room in manager.rooms.values():
+            room.bookings
+
+    def reset_indexes():
+        for room in manager.rooms.values():
+            room.__dict__.pop("_bookings", None)
+        return manager
+
+    orders = {order.identity: order for room in domain_rooms for order in room.orders}
+    order_manager = OrderManager(orders)
+    last_room = manager.rooms[hotel_data.rooms_count]
+
+    def book_and_cancel():
+        order = order_manager.create(free)
+        last_room.add_order(order)
+        last_room.remove_order(order)
+
+    users = [(User(f"user{i}", f"user{i}@email.com", "password_hash"),) for i in range(min(hotel_data.rooms_count, 1000))]
+
+    room_rows = [(i["number"], i["capacity"], i["price"]) for i in hotel_data.room_rows()]
+    order_rows = [(i["identity"], i["room_id"], i["arrival"], i["departure"]) for i in hotel_data.order_rows()]
+
+    def build_occupancy():
+        return OccupancyMap.build(date.today(), OCCUPANCY_DAYS, room_rows, order_rows)
+
+    occupancy = build_occupancy()
+
+    return {
+        "room_manager_init": measure(init_rooms, repeat),
+        "booking_index_build": measure(build_indexes, repeat, setup=reset_indexes),
+        "find_room_free": measure(lambda: manager.find_room(free, 1), repeat),
+        "find_room_busy": measure(lambda: manager.find_room(busy, 1), repeat),
+        "check_room": measure(lambda: manager._check_free_room(free, last_room), repeat),
+        "order_manager_init": measure(lambda: OrderManager(orders), repeat),
+        "order_manager_get_id": measure(order_manager.get_id, repeat),
+        "book_and_cancel": measure(book_and_cancel, repeat),
+        "user_manager_init": measure(lambda: UserManager.init(users), repeat),
+        "occupancy_build": measure(build_occupancy, repeat),
+        "occupancy_find_free": measure(lambda: occupancy.find_free(1, *hotel_data.free_dates), repeat),
+        "occupancy_find_busy": measure(lambda: occupancy.find_free(1, *hotel_data.busy_dates), repeat),
+    }
+
+
+def bench_sqlite(hotel_data: Hotel, repeat: int) -> Dict[str, dict]:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    metadata_obj.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(rooms.insert(), hotel_data.room_rows())
+        order_rows = hotel_data.order_rows()
+        for i in range(0, len(order_rows), 10000):
+            connection.execute(order.insert(), order_rows[i:i + 10000])
+
+    def room_worker():
+        return SqlAlchemyUOW(repo=RoomRepository, session=Session(engine))
+
+    def order_worker():
+        return SqlAlchemyUOW(repo=OrderRepository, session=Session(engine))
+
+    free = hotel_data.free_dates
+    busy = hotel_data.busy_dates
+    number = hotel_data.rooms_count
+
+    def book_and_cancel():
+        identity = hotel.booking(number, *free, workers=room_worker())
+        hotel.delete_order(identity, workers=order_worker())
+
+    def find_rooms(dates):
+        return lambda *args: hotel.find_rooms(1, *dates, workers=room_worker())
+
+    def get_rooms(*args):
+        return hotel.get_rooms(workers=room_worker())
+
+    def get_room_by_num(*args):
+        return hotel.get_room_by_num(number, workers=room_worker())
+
+    res = {
+        # кэш поиска сбрасывается перед каждым замером, иначе меряется только попадание в него
+        "find_rooms_free": measure(find_rooms(free), repeat, setup=search_cache.clear),
+        "find_rooms_busy": measure(find_rooms(busy), repeat, setup=search_cache.clear),
+        "find_rooms_cached": measure_cached(find_rooms(free), repeat),
+        "get_room_orders": measure(lambda: hotel.get_room_orders(number, workers=room_worker()), repeat),
+        "get_order_by_id": measure(lambda: hotel.get_order_by_id(1, workers=order_worker()), repeat),
+        # справочник комнат сбрасывается перед каждым замером, кэшированный путь - отдельно
+        "get_rooms": measure(get_rooms, repeat, setup=room_catalog.invalidate),
+        "get_rooms_cached": measure_cached(get_rooms, repeat),
+        "get_room_by_num": measure(get_room_by_num, repeat, setup=room_catalog.invalidate),
+        "get_room_by_num_cached": measure_cached(get_room_by_num, repeat),
+        "book_and_cancel": measure(book_and_cancel, repeat),
+    }
+    engine.dispose()
+    return res
+
+
+def default_response(model) -> Callable[[list], bytes]:
+    """путь fastapi по умолчанию: валидация response_model, jsonable_encoder, json.dumps"""
+    field = create_response_field(name="response", type_=List[model])
+
+    def render(rows: list) -> bytes:
+        value, errors = field.validate([row._asdict() for row in rows], {}, loc=("response",))
+        assert not errors
+        return JSONResponse(content=jsonable_encoder(value)).body
+
+    return render
+
+
+def bench_json(hotel_data: Hotel, repeat: int) -> Dict[str, dict]:
+    """ответ на rooms_count строк комнат и столько же строк броней"""
+    room_rows = [RoomView(i["number"], i["capacity"], i["price"]) for i in hotel_data.room_rows()]
+    order_rows = [OrderView(i["identity"], i["arrival"], i["departure"]) for i in hotel_data.order_rows()]
+    order_rows = order_rows[:hotel_data.rooms_count]
+    rooms_default, orders_default = default_response(RoomResponse), default_response(OrderResponse)
+    room_serializer, order_serializer = row_serializer(RoomView), row_serializer(OrderView)
+    return {
+        "rooms_default": measure(lambda: rooms_default(room_rows), repeat),
+        "rooms_orjson": measure(lambda: rows_response(room_rows, room_serializer).body, repeat),
+        "orders_default": measure(lambda: orders_default(order_rows), repeat),
+        "orders_orjson": measure(lambda: rows_response(order_rows, order_serializer).body, repeat),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes: List[int], bookings: int, repeat: int, backends: List[str]) -> dict:
+    benches = {"memory": bench_memory, "sqlite": bench_sqlite, "json": bench_json}
+    results = []
+    for size in sizes:
+        hotel_data = Hotel(size, bookings)
+        for backend in backends:
+            for name, timing in benches[backend](hotel_data, repeat).items():
+                results.append({
+                    "backend": backend,
+                    "name": name,
+                    "rooms": size,
+                    "orders": hotel_data.orders_count,
+                    "repeat": repeat,
+                    **timing,
+                })
+                print(
+                    f"{backend:8} {name:24} rooms={size:<7} orders={hotel_data.orders_count:<9} "
+                    f"median={timing['median'] * 1000:.3f}ms",
+                    file=sys.stderr,
+                )
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def _key(item: dict):
+    return item["backend"], item["name"], item["rooms"], item["orders"]
+
+
+def compare(old: dict, new: dict):
+    """отношение медиан new/old, больше 1 - стало медленнее"""
+    old_results = {_key(i): i for i in old["results"]}
+    print(f"{old['revision']} -> {new['revision']}")
+    for item in new["results"]:
+        before = old_results.get(_key(item))
+        if before is None:
+            continue
+        ratio = item["median"] / before["median"] if before["median"] else float("inf")
+        print(
+            f"{item['backend']:8} {item['name']:22} rooms={item['rooms']:<7} "
+            f"{before['median'] * 1000:.3f}ms -> {item['median'] * 1000:.3f}ms x{ratio:.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", default="100,1000,10000", help="размеры отеля через запятую")
+    parser.add_argument("--bookings", type=int, default=20, help="броней на комнату")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", action="append", choices=["memory", "sqlite", "json"])
+    parser.add_argument("--output", help="json файл с результатами")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="сравнить два json файла")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+        return
+
+    sizes = [int(i) for i in args.rooms.split(",")]
+    report = run(sizes, args.bookings, args.repeat, args.backend or ["memory", "sqlite", "json"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""выгрузка броней за период в NDJSON или CSV
+
+    python -m hotel_california.entrypoints.commands.export_orders 2026-01-01 2026-02-01 --format csv -o orders.csv
+
+строки читаются из бд серверным курсором и пишутся пачками, память не растет с размером выгрузки
+"""
+import argparse
+import sys
+from datetime import date
+
+from hotel_california.adapters.orm import start_mappers
+from hotel_california.adapters.repository import OrderRepository
+from hotel_california.adapters.sqlalchemy_init import SessionLocal
+from hotel_california.service_layer.export import ENCODERS
+from hotel_california.service_layer.service.hotel import export_orders
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+start_mappers()
+
+
+def export_orders_cmd(date_from: date, date_to: date, fmt: str, output):
+    worker = SqlAlchemyUOW(repo=OrderRepository, session=SessionLocal())
+    for chunk in export_orders(date_from, date_to, fmt, workers=worker):
+        output.write(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("date_from", type=date.fromisoformat, help="начало периода, включительно")
+    parser.add_argument("date_to", type=date.fromisoformat, help="конец периода, не включительно")
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="ndjson")
+    parser.add_argument("-o", "--output", help="файл, по умолчанию stdout")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            export_orders_cmd(args.date_from, args.date_to, args.format, output)
+    else:
+        export_orders_cmd(args.date_from, args.date_to, args.format, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
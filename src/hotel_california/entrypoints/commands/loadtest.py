@@ -0,0 +1,373 @@
+"""нагрузочный тест http api: смесь поиска, бронирования, просмотра и отмены броней и логина
+
+    python -m hotel_california.entrypoints.commands.loadtest --duration 30 --concurrency 50
+    python -m hotel_california.entrypoints.commands.loadtest --url http://localhost:8000 --allow-writes \\
+        --email test_user@email.com --password длинный_пассворд
+
+без --url приложение запускается в процессе (ASGI напрямую, без сети) на временной sqlite,
+запросы конкурентно идут в один event loop - блокирующий код в async роутерах
+сразу виден по росту латентности всех маршрутов.
+с --url нагрузка идет на запущенный uvicorn, пользователь с --email должен существовать.
+тест заводит комнаты и оставляет брони в бд сервера, поэтому --url только вместе с --allow-writes
+и только против отдельной бд для нагрузки
+
+отчет: пропускная способность и p50/p95/p99 по каждому маршруту
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+# маршрут -> вес в смеси по умолчанию
+DEFAULT_MIX = "search=50,booking=15,order=20,cancel=5,login=10"
+ROUTES = {
+    "search": "GET /rooms",
+    "booking": "GET /rooms/{num}/booking",
+    "order": "GET /orders/{order_id}",
+    "cancel": "GET /orders/{order_id}/cancel",
+    "login": "POST /users/login",
+}
+# брони начинаются позже чем через 3 дня, чтобы их можно было отменить
+FIRST_DAY = 10
+DAYS = 365
+CAPACITIES = 4
+
+Response = Tuple[int, bytes]
+Transport = Callable[..., Awaitable[Response]]
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"неизвестный маршрут {name}, есть {', '.join(ROUTES)}")
+        mix[name] = int(weight)
+    return mix
+
+
+def percentile(values: List[float], q: float) -> float:
+    """перцентиль по ближайшему рангу, values отсортирован"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+@dataclass
+class Stats:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+
+    def add(self, route: str, status: int, latency: float):
+        self.latencies[route].append(latency)
+        self.statuses[route][status] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(len(i) for i in self.latencies.values())
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            statuses = self.statuses[route]
+            routes[route] = {
+                "requests": len(latencies),
+                "rps": len(latencies) / elapsed,
+                "errors": sum(count for status, count in statuses.items() if status >= 500),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": latencies[-1] * 1000,
+            }
+        return {"elapsed": elapsed, "requests": self.total, "rps": self.total / elapsed, "routes": routes}
+
+
+def asgi_transport(app) -> Transport:
+    """вызов ASGI приложения без сети, ответ целиком в память"""
+
+    async def request(method: str, path: str, params=None, json_body=None, headers=None) -> Response:
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        raw_headers = [(b"host", b"loadtest")]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode(), value.encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": urlencode(params or {}).encode(),
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        response_done = asyncio.Event()
+        request_sent = False
+        status = 0
+        chunks = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        try:
+            await app(scope, receive, send)
+        except Exception:
+            # ServerErrorMiddleware уже отдал 500 и пробрасывает исключение дальше, как под uvicorn
+            status = status or 500
+        return status, b"".join(chunks)
+
+    return request
+
+
+def http_transport(url: str, concurrency: int) -> Transport:
+    """запросы к запущенному серверу через requests в пуле потоков"""
+    import requests
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def blocking(method, path, params, json_body, headers):
+        response = session.request(method, url.rstrip("/") + path, params=params, json=json_body, headers=headers)
+        return response.status_code, response.content
+
+    async def request(method: str, path: str, params=None, json_body=None, headers=None) -> Response:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, blocking, method, path, params, json_body, headers)
+
+    return request
+
+
+class Workload:
+    """сценарии маршрутов, номера броней копятся в общем списке для просмотра и отмены"""
+
+    def __init__(self, transport: Transport, email: str, password: str, rooms: List[int], seed: int = 0):
+        self.transport = transport
+        self.email = email
+        self.password = password
+        self.rooms = rooms
+        self.random = random.Random(seed)
+        self.orders: List[int] = []
+        self.headers: Dict[str, str] = {}
+
+    def dates(self, nights: Optional[int] = None) -> Dict[str, str]:
+        arrival = date.today() + timedelta(days=self.random.randrange(FIRST_DAY, FIRST_DAY + DAYS))
+        departure = arrival + timedelta(days=nights or self.random.randint(1, 7))
+        return {"arrival": arrival.isoformat(), "departure": departure.isoformat()}
+
+    async def login(self) -> Response:
+        status, body = await self.transport(
+            "POST", "/users/login", json_body={"email": self.email, "password": self.password}
+        )
+        if status == 200:
+            self.headers = {"Authorization": f"Bearer {json.loads(body)['access']}"}
+        return status, body
+
+    async def search(self) -> Response:
+        params = {"cap": self.random.randint(1, CAPACITIES), **self.dates()}
+        return await self.transport("GET", "/rooms", params=params, headers=self.headers)
+
+    async def booking(self) -> Response:
+        num = self.random.choice(self.rooms)
+        status, body = await self.transport("GET", f"/rooms/{num}/booking", params=self.dates(), headers=self.headers)
+        if status == 200:
+            self.orders.append(json.loads(body)["order_id"])
+        return status, body
+
+    async def order(self) -> Response:
+        if not self.orders:
+            return await self.booking()
+        order_id = self.random.choice(self.orders)
+        return await self.transport("GET", f"/orders/{order_id}", headers=self.headers)
+
+    async def cancel(self) -> Response:
+        if not self.orders:
+            return await self.booking()
+        order_id = self.orders.pop(self.random.randrange(len(self.orders)))
+        return await self.transport("GET", f"/orders/{order_id}/cancel", headers=self.headers)
+
+    async def run(self, mix: Dict[str, int], concurrency: int, duration: float, requests: Optional[int]) -> dict:
+        names = list(mix)
+        weights = [mix[i] for i in names]
+        stats = Stats()
+        deadline = time.perf_counter() + duration
+        budget = requests
+
+        async def user():
+            nonlocal budget
+            while time.perf_counter() < deadline:
+                if budget is not None:
+                    if budget <= 0:
+                        return
+                    budget -= 1
+                name = self.random.choices(names, weights)[0]
+                # пустой список броней превращает просмотр и отмену в бронирование
+                route = ROUTES["booking"] if name in ("order", "cancel") and not self.orders else ROUTES[name]
+                start = time.perf_counter()
+                status, _ = await getattr(self, name)()
+                stats.add(route, status, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return stats.report(time.perf_counter() - start)
+
+
+async def seed_rooms(transport: Transport, headers: Dict[str, str], count: int, first: int) -> List[int]:
+    numbers = list(range(first, first + count))
+    for number in numbers:
+        room = {"number": number, "capacity": number % CAPACITIES + 1, "price": 100.0}
+        status, body = await transport("POST", "/rooms", json_body=room, headers=headers)
+        if status not in (201, 422):
+            raise RuntimeError(f"не удалось добавить комнату {number}: {status} {body!r}")
+    return numbers
+
+
+def in_process_app(db_path: str, email: str, password: str):
+    """приложение на sqlite файле вместо настроенной бд, таблицы и пользователь создаются"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from hotel_california.adapters.orm import metadata_obj
+    from hotel_california.adapters.repository import UserRepository
+    from hotel_california.config import get_settings
+    from hotel_california.entrypoints.app.main import app
+    from hotel_california.entrypoints.app.workers import get_db
+    from hotel_california.service_layer.service.hotel import add_user
+    from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    metadata_obj.create_all(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    add_user("loadtest", email, password, True, workers=SqlAlchemyUOW(repo=UserRepository, session=session_factory()))
+
+    if get_settings().DB.async_mode:
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async_session_factory = sessionmaker(expire_on_commit=False, bind=async_engine, class_=AsyncSession)
+
+        async def override_get_db():
+            async with async_session_factory() as db:
+                yield db
+    else:
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+async def load(args) -> dict:
+    if args.url:
+        transport = http_transport(args.url, args.concurrency)
+    else:
+        app = in_process_app(args.db, args.email, args.password)
+        transport = asgi_transport(app)
+
+    workload = Workload(transport, args.email, args.password, rooms=[], seed=args.seed)
+    status, body = await workload.login()
+    if status != 200:
+        raise RuntimeError(f"логин не прошел: {status} {body!r}")
+    workload.rooms = await seed_rooms(transport, workload.headers, args.rooms, args.first_room)
+    report = await workload.run(args.mix, args.concurrency, args.duration, args.requests)
+    report["target"] = args.url or "in-process"
+    report["concurrency"] = args.concurrency
+    report["mix"] = args.mix
+    return report
+
+
+def print_report(report: dict):
+    print(
+        f"{report['target']}: {report['requests']} запросов за {report['elapsed']:.1f}s, "
+        f"{report['rps']:.1f} rps, concurrency={report['concurrency']}",
+        file=sys.stderr,
+    )
+    print(f"{'route':28} {'count':>7} {'rps':>8} {'5xx':>5} {'p50':>9} {'p95':>9} {'p99':>9}", file=sys.stderr)
+    for route, item in report["routes"].items():
+        print(
+            f"{route:28} {item['requests']:7} {item['rps']:8.1f} {item['errors']:5} "
+            f"{item['p50_ms']:7.1f}ms {item['p95_ms']:7.1f}ms {item['p99_ms']:7.1f}ms",
+            file=sys.stderr,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="адрес запущенного сервера, без него приложение в процессе")
+    parser.add_argument(
+        "--allow-writes", action="store_true", help="с --url: согласие писать комнаты и брони в бд сервера"
+    )
+    parser.add_argument("--db", help="sqlite файл для режима в процессе, по умолчанию временный")
+    parser.add_argument("--email", default="loadtest@email.com")
+    parser.add_argument("--password", default="loadtest_password")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"веса маршрутов, {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=20, help="одновременных виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=10, help="секунд нагрузки")
+    parser.add_argument("--requests", type=int, help="остановиться после стольких запросов")
+    parser.add_argument("--rooms", type=int, default=50, help="сколько комнат завести перед нагрузкой")
+    parser.add_argument("--first-room", type=int, default=1, help="номер первой заводимой комнаты")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="json файл с отчетом")
+    args = parser.parse_args(argv)
+    if args.url and not args.allow_writes:
+        parser.error("--url заводит комнаты и брони в бд сервера, подтвердите флагом --allow-writes")
+
+    tmp = None
+    if not args.url and not args.db:
+        tmp = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False)
+        tmp.close()
+        args.db = tmp.name
+    try:
+        report = asyncio.run(load(args))
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
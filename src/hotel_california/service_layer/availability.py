@@ -0,0 +1,92 @@
+"""матрица занятости комнат в памяти процесса для поиска свободных комнат
+
+включается settings.SEARCH.occupancy_map, строится при первом поиске за день
+двумя запросами (комнаты и брони окна), дальше обновляется бронированием, отменой
+и добавлением комнат этого процесса. изменения из других процессов (воркеров)
+попадают в матрицу только при следующей сборке, поэтому поиск может показать
+комнату, уже занятую в другом воркере - сама бронь все равно проверяется в бд
+под блокировкой строки комнаты
+"""
+import threading
+from datetime import date, timedelta
+from typing import Callable, Iterable, Optional, Tuple
+
+from hotel_california.config import get_settings
+from hotel_california.domain.occupancy import OccupancyMap
+from hotel_california.service_layer.exceptions import RoomExistError, RoomNotFound
+
+settings = get_settings()
+
+
+class Availability:
+    def __init__(self, enabled: bool, days: int, today: Callable[[], date] = date.today):
+        """
+        Args:
+            enabled: искать по матрице вместо бд
+            days: окно матрицы в днях от сегодня
+            today: источник даты, для тестов
+        """
+        self.enabled = enabled
+        self.days = days
+        self._today = today
+        self._map: Optional[OccupancyMap] = None
+        # счетчик изменений, матрица собранная параллельно с изменением не сохраняется
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[OccupancyMap]:
+        """матрица, если она собрана сегодня, иначе ее нужно собрать заново"""
+        occupancy = self._map
+        if occupancy is not None and occupancy.start == self._today():
+            return occupancy
+        return None
+
+    def window(self) -> Tuple[date, date]:
+        """период броней для сборки матрицы"""
+        start = self._today()
+        return start, start + timedelta(days=self.days)
+
+    def install(
+            self,
+            rooms: Iterable[Tuple[int, int, float]],
+            orders: Iterable[Tuple[int, int, date, date]],
+            generation: int,
+    ) -> OccupancyMap:
+        """собрать матрицу по строкам из бд, прочитанным при счетчике изменений generation"""
+        occupancy = OccupancyMap.build(self._today(), self.days, rooms, orders)
+        with self._lock:
+            if generation == self.generation:
+                self._map = occupancy
+        return occupancy
+
+    def _apply(self, change: Callable[[OccupancyMap], None]):
+        with self._lock:
+            self.generation += 1
+            if self._map is None:
+                return
+            try:
+                change(self._map)
+            except (RoomNotFound, RoomExistError):
+                # комнату добавили в другом процессе или матрица собрана уже с ней,
+                # проще собрать заново
+                self._map = None
+
+    def room_added(self, number: int, capacity: int, price: float):
+        self._apply(lambda occupancy: occupancy.add_room(number, capacity, price))
+
+    def booked(self, number: int, identity: int, arrival: date, departure: date):
+        self._apply(lambda occupancy: occupancy.book(number, identity, arrival, departure))
+
+    def released(self, identity: int, arrival: date, departure: date):
+        self._apply(lambda occupancy: occupancy.release(identity, arrival, departure))
+
+    def reset(self):
+        with self._lock:
+            self.generation += 1
+            self._map = None
+
+
+availability = Availability(
+    enabled=settings.SEARCH.occupancy_map,
+    days=settings.SEARCH.occupancy_days,
+)
@@ -0,0 +1,196 @@
+"""кэши в памяти процесса"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, Optional
+
+from hotel_california.config import get_settings
+from hotel_california.domain.models import booking_span
+
+settings = get_settings()
+
+_MISSING = object()
+
+
+class LRUCache:
+    """LRU кэш с временем жизни записей и счетчиками попаданий
+
+    потокобезопасный: синхронные сервисы выполняются в пуле потоков.
+    generation растет при каждом сбросе: значение, вычисленное параллельно
+    со сбросом, не сохраняется, если в set передан generation до вычисления
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            maxsize: максимум записей, самые давно использованные вытесняются
+            ttl: время жизни записи в секундах, None - без ограничения
+            clock: источник времени, для тестов
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires is None or expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """запись в кэш, ttl записи не больше ttl кэша"""
+        if self.ttl is not None:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        expires = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self.generation += 1
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """удаляет записи, для которых predicate(key, value) истинен"""
+        with self._lock:
+            self.generation += 1
+            keys = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class Snapshot:
+    """одно значение целиком (например справочник) с версией и временем жизни
+
+    значение, прочитанное параллельно с invalidate, не сохраняется:
+    перед чтением из бд берется generation и передается в set
+    """
+
+    def __init__(self, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._value: Any = _MISSING
+        self._version: Optional[Hashable] = None
+        self._expires: Optional[float] = None
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, version: Optional[Hashable] = None, default: Any = None) -> Any:
+        """значение, если оно не истекло и (при переданной version) той же версии"""
+        with self._lock:
+            fresh = self._expires is None or self._expires > self._clock()
+            if self._value is not _MISSING and fresh and (version is None or version == self._version):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            return default
+
+    def set(self, value: Any, version: Optional[Hashable] = None, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._value = value
+            self._version = version
+            self._expires = None if self.ttl is None else self._clock() + self.ttl
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            if self._value is not _MISSING:
+                self.invalidations += 1
+            self._value = _MISSING
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# пользователь авторизованный по cookie (email, is_admin), ключ - токен,
+# запись живет до PRINCIPAL_CACHE_TTL или истечения токена: изменения и удаления
+# пользователей в сервисе нет, поэтому и точечного сброса нет
+principal_cache = LRUCache(
+    maxsize=settings.AUTH.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.AUTH.PRINCIPAL_CACHE_TTL,
+)
+
+
+# проверенные payload jwt, ключ - (токен, audience), живут не дольше exp токена
+token_cache = LRUCache(
+    maxsize=settings.AUTH.TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH.TOKEN_CACHE_TTL,
+)
+
+
+# свободные комнаты, ключ - (вместимость, заезд, выезд)
+search_cache = LRUCache(
+    maxsize=settings.SEARCH.cache_size,
+    ttl=settings.SEARCH.cache_ttl,
+)
+
+
+def invalidate_search(capacity: int, arrival: Optional[date] = None, departure: Optional[date] = None) -> int:
+    """сбросить результаты поиска, которые могла изменить бронь комнаты вместимости capacity
+
+    только записи той же вместимости с пересекающимися датами, остальные результаты не меняются,
+    без дат (новая комната) - все записи этой вместимости
+    """
+    if arrival is None:
+        return search_cache.invalidate(lambda key, rooms: key[0] == capacity)
+    arrival, departure = booking_span(arrival, departure)
+
+    def overlaps(key, rooms) -> bool:
+        cap, first, last = key
+        first, last = booking_span(first, last)
+        return cap == capacity and first < departure and arrival < last
+
+    return search_cache.invalidate(overlaps)
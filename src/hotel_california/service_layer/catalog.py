@@ -0,0 +1,42 @@
+"""справочник комнат (number, capacity, price) в памяти процесса
+
+справочник меняется только при add_room, поэтому список комнат и поиск комнаты
+по номеру читаются из памяти. снимок сбрасывается при add_room этого процесса
+и по settings.CATALOG.ttl, с settings.CATALOG.version_check на каждом чтении
+сверяется счетчик изменений в бд (catalog_versions), который add_room увеличивает
+"""
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+from hotel_california.adapters.repository import DEFAULT_PAGE_SIZE, Page, RoomView, make_page
+from hotel_california.config import get_settings
+from hotel_california.service_layer.cache import Snapshot
+
+settings = get_settings()
+
+ROOMS = "rooms"
+
+
+class RoomCatalog:
+    def __init__(self, rooms: List[RoomView]):
+        """
+        Args:
+            rooms: комнаты по возрастанию номера
+        """
+        self.rooms = rooms
+        self._numbers = [i.number for i in rooms]
+        self._by_number: Dict[int, RoomView] = dict(zip(self._numbers, rooms))
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def get(self, number: int) -> Optional[RoomView]:
+        return self._by_number.get(number)
+
+    def page(self, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+        """то же что RoomRepository.page, срезом списка"""
+        start = 0 if after is None else bisect_right(self._numbers, after)
+        return make_page(self.rooms[start:start + limit + 1], limit, lambda i: i.number)
+
+
+room_catalog = Snapshot(ttl=settings.CATALOG.ttl)
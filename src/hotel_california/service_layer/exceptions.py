@@ -64,3 +64,17 @@ class DatesNotValid(BusinessLogicError):
 
 class OrderNotCancel(BusinessLogicError):
     pass
+
+
+class ServiceBusy(Exception):
+    """ресурс перегружен, запрос стоит повторить через retry_after секунд"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class PasswordPoolBusy(ServiceBusy):
+    def __init__(self, retry_after: int = 1):
+        message = "Пул проверки паролей перегружен"
+        super().__init__(message, retry_after=retry_after)
@@ -0,0 +1,53 @@
+"""кодирование выгрузки броней в NDJSON и CSV
+
+строки кодируются пачками, одна пачка из курсора бд - один кусок ответа
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Dict, Iterable, Sequence
+
+from hotel_california.service_layer.exceptions import BusinessLogicError, DatesNotValid
+
+COLUMNS = ("identity", "room", "arrival", "departure")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def encode_ndjson(rows: Iterable[Sequence]) -> str:
+    return "".join(
+        json.dumps({"identity": identity, "room": room, "arrival": arrival.isoformat(),
+                    "departure": departure.isoformat()}) + "\n"
+        for identity, room, arrival, departure in rows
+    )
+
+
+def encode_csv(rows: Iterable[Sequence]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def csv_header() -> str:
+    return encode_csv([COLUMNS])
+
+
+ENCODERS: Dict[str, Callable[[Iterable[Sequence]], str]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+HEADERS: Dict[str, Callable[[], str]] = {
+    "ndjson": lambda: "",
+    "csv": csv_header,
+}
+
+
+def check_export(date_from: date, date_to: date, fmt: str):
+    if fmt not in ENCODERS:
+        raise BusinessLogicError(f"Формат выгрузки {fmt} не поддерживается")
+    if date_from >= date_to:
+        raise DatesNotValid(f"Начало периода {date_from} должно быть раньше конца {date_to}")
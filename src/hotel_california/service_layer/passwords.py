@@ -0,0 +1,56 @@
+"""hash/verify паролей в отдельном пуле потоков
+
+bcrypt занимает сотни миллисекунд cpu и отпускает GIL,
+поэтому выносится из event loop и общего пула потоков в свой пул
+с ограниченной очередью. Если очередь заполнена - сразу PasswordPoolBusy,
+а не рост задержек у всех запросов.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from hotel_california.config import get_settings
+from hotel_california.domain.models import PasswordContext
+from hotel_california.service_layer.exceptions import PasswordPoolBusy
+
+settings = get_settings()
+
+
+class PasswordPool:
+    def __init__(self, size: int, queue_size: int, retry_after: int = 1, context=PasswordContext):
+        self.size = size
+        self.retry_after = retry_after
+        self._context = context
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="passwords")
+        # выполняющиеся и ожидающие задачи
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+
+    def _submit(self, func, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy(retry_after=self.retry_after)
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(self._context.hash, password).result()
+
+    def verify(self, password_raw: str, password_hash: str) -> bool:
+        return self._submit(self._context.verify, password_raw, password_hash).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self._context.hash, password))
+
+    async def verify_async(self, password_raw: str, password_hash: str) -> bool:
+        return await asyncio.wrap_future(self._submit(self._context.verify, password_raw, password_hash))
+
+
+password_pool = PasswordPool(
+    size=settings.AUTH.PASSWORD_POOL_SIZE,
+    queue_size=settings.AUTH.PASSWORD_POOL_QUEUE,
+    retry_after=settings.AUTH.PASSWORD_POOL_RETRY_AFTER,
+)
@@ -1,28 +1,92 @@
-from datetime import date
-from typing import List, Optional, Tuple
+import time
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
 
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
 
+from hotel_california.adapters.repository import DEFAULT_PAGE_SIZE, OrderView, Page, RoomView
+from hotel_california.config import get_settings
+from hotel_california.domain.occupancy import MAX_CALENDAR_DAYS, Calendar, OccupancyMap
 from hotel_california.domain.models import (
     ALGORITHM,
     SECRET_KEY,
     BookingDate,
-    Order,
     RefreshToken,
     Room,
     UserManager, RoomManager, Status, OrderManager,
 )
 from hotel_california.service_layer.exceptions import (
     AuthenticationJwtError,
-    UserNotAdmin, OrderNotCancel,
+    OrderNotCancel, OrderNotFound, NonUniqEmail, RoomExistError, DatesNotValid, RoomNotFound,
 )
-from hotel_california.service_layer.unit_of_work import UOW
+from hotel_california.service_layer.availability import availability
+from hotel_california.service_layer.catalog import ROOMS, RoomCatalog, room_catalog
+from hotel_california.service_layer.export import ENCODERS, HEADERS, check_export
+from hotel_california.service_layer.cache import invalidate_search, search_cache, token_cache
+from hotel_california.service_layer.passwords import password_pool
+from hotel_california.service_layer.unit_of_work import UOW, retry_on_conflict
+
+settings = get_settings()
+
+
+def _get_user_manager(email: str, worker: UOW) -> UserManager:
+    """агрегат только из искомого пользователя вместо всей таблицы"""
+    user = worker.data.get(email)
+    return UserManager({email: user} if user else {}, passwords=password_pool)
+
+
+def _get_room_manager(num: int, worker: UOW, with_orders: bool = False, for_update: bool = False) -> RoomManager:
+    room = worker.data.get(num, with_orders=with_orders, for_update=for_update)
+    return RoomManager({num: room} if room else {})
+
+
+def _get_catalog(worker: UOW) -> RoomCatalog:
+    """справочник комнат из памяти, из бд только после сброса или смены версии"""
+    version = worker.data.catalog_version(ROOMS) if settings.CATALOG.version_check else None
+    catalog = room_catalog.get(version)
+    if catalog is None:
+        generation = room_catalog.generation
+        catalog = RoomCatalog(worker.data.catalog())
+        room_catalog.set(catalog, version, generation)
+    return catalog
+
+
+def _get_room_view(num: int, worker: UOW) -> RoomView:
+    """комната из справочника
+
+    комнаты нет в справочнике - проверка в бд, справочник мог еще не увидеть
+    комнату, добавленную в другом процессе
+    """
+    room = _get_catalog(worker).get(num)
+    if room is None:
+        room = worker.data.get_view(num)
+        if room is None:
+            raise RoomNotFound(num)
+        room_catalog.invalidate()
+    return room
+
+
+def _get_order_manager(order_id: int, worker: UOW, with_room: bool = False) -> OrderManager:
+    order = worker.data.get(order_id, with_room=with_room)
+    return OrderManager({order_id: order} if order else {})
+
+
+def _get_occupancy(worker: UOW) -> OccupancyMap:
+    """матрица занятости процесса, собирается если ее еще нет сегодня"""
+    occupancy = availability.current()
+    if occupancy is None:
+        generation = availability.generation
+        rows = worker.data.occupancy_rows(*availability.window())
+        occupancy = availability.install(*rows, generation)
+    return occupancy
 
 
 def add_user(name: str, email: str, password: str, is_admin: bool, workers: UOW):
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
+        if worker.data.exists(email):
+            raise NonUniqEmail(email)
+        manager = UserManager({}, passwords=password_pool)
         u = manager.create(name, email, password, is_admin)
         worker.data.add(u)
         worker.commit()
@@ -30,19 +94,19 @@ def add_user(name: str, email: str, password: str, is_admin: bool, workers: UOW)
 
 def get_user_by_email(email: str, workers: UOW):
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
+        manager = _get_user_manager(email, worker)
         return manager.get_user_by_email(email)
 
 
-def get_users(workers: UOW) -> List[Room]:
+def get_users(workers: UOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    """страница пользователей по id"""
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
-        return manager.users.values()
+        return worker.data.page(after, limit)
 
 
 def login_user_and_get_tokens(email: str, password: str, workers: UOW) -> Tuple[str, str]:
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
+        manager = _get_user_manager(email, worker)
         user = manager.login(email, password)
         access = manager.get_access_token(email)
         refresh = manager.get_refresh_token(email)
@@ -54,22 +118,14 @@ def login_user_and_get_tokens(email: str, password: str, workers: UOW) -> Tuple[
 
 def get_access_token(email: str, password: str, workers: UOW) -> Tuple[str, str]:
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
+        manager = _get_user_manager(email, worker)
         manager.login(email, password)
         return manager.get_access_token(email)
 
 
-def check_is_admin(email: str, workers: UOW) -> bool:
-    with workers as worker:
-        manager = UserManager.init(worker.data.all())
-        user = manager.get_user_by_email(email)
-        if not user.is_admin:
-            raise UserNotAdmin(email=email)
-
-
 def refresh_token(email: str, workers: UOW) -> Tuple[str, str]:
     with workers as worker:
-        manager = UserManager.init(worker.data.all())
+        manager = _get_user_manager(email, worker)
         user = manager.get_user_by_email(email)
         if not user.token:
             message = "Refresh token alredy used"
@@ -83,8 +139,17 @@ def refresh_token(email: str, workers: UOW) -> Tuple[str, str]:
 
 
 def decode_token(token: str, audience: Optional[str] = None) -> dict:
+    """проверка подписи и claims jwt
+
+    успешно проверенные payload кэшируются до exp токена,
+    повторная проверка того же токена - поиск в словаре
+    """
+    key = (token, audience)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
     try:
-        return jwt.decode(
+        payload = jwt.decode(
             token,
             SECRET_KEY,
             algorithms=[ALGORITHM],
@@ -96,88 +161,141 @@ def decode_token(token: str, audience: Optional[str] = None) -> dict:
     except (JWTError, JWTClaimsError) as err:
         message = "Invalid jwt"
         raise AuthenticationJwtError(message) from err
+    ttl = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(key, payload, ttl=ttl)
+    return dict(payload)
 
 
 def add_room(number: int, capacity: int, price: float, workers: UOW) -> Room:
     """добавление комнаты"""
     with workers as worker:
-        manager = RoomManager.init(worker.data.all())
+        if worker.data.exists(number):
+            raise RoomExistError(number)
+        manager = RoomManager({})
         room = manager.create(number, capacity, price)
         worker.data.add(room)
+        if settings.CATALOG.version_check:
+            worker.data.bump_catalog_version(ROOMS)
         worker.commit()
-        return room.number
+        room_catalog.invalidate()
+        availability.room_added(number, capacity, price)
+        invalidate_search(capacity)
+        # после коммита атрибуты room истекли, номер уже известен без перезагрузки
+        return number
 
 
-def get_order_by_id(order_id: int, workers: UOW) -> dict:
+def get_order_by_id(order_id: int, workers: UOW) -> OrderView:
     with workers as worker:
-        manager = OrderManager.init(worker.data.all())
-        order = manager.get_order_by_id(order_id)
-        return order.get_dict
+        view = worker.data.get_view(order_id)
+        if view is None:
+            raise OrderNotFound(order_id)
+        return view
 
 
-def find_rooms(cap: int, arrival: str, departure: str, workers: UOW) -> List[Room]:
-    with workers as worker:
-        manager = RoomManager.init(worker.data.all())
-        dates = (BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE))
-        return manager.find_room(dates, cap)
+def find_rooms(cap: int, arrival: date, departure: date, workers: UOW) -> List[RoomView]:
+    """поиск свободных комнат, фильтрация целиком в запросе к бд
 
+    или по матрице занятости в памяти, если она включена и даты внутри ее окна,
+    результат кэшируется до брони или отмены с пересекающимися датами
+    """
+    key = (cap, arrival, departure)
+    rooms = search_cache.get(key)
+    if rooms is None:
+        # бронь или отмена во время поиска сбрасывает кэш, тогда результат не сохраняется
+        generation = search_cache.generation
+        rooms = _find_rooms(cap, arrival, departure, workers)
+        search_cache.set(key, rooms, generation=generation)
+    return list(rooms)
 
-def get_room_by_num(num: int, workers: UOW) -> Room:
+
+def _find_rooms(cap: int, arrival: date, departure: date, workers: UOW) -> Tuple[RoomView, ...]:
     with workers as worker:
-        manager = RoomManager.init(worker.data.all())
-        return manager.get_room_by_num(num)
+        if availability.enabled:
+            occupancy = _get_occupancy(worker)
+            if occupancy.covers(arrival, departure):
+                return tuple(RoomView._make(i) for i in occupancy.find_free(cap, arrival, departure))
+        return tuple(worker.data.find_free(cap, arrival, departure))
+
 
+def get_calendar(date_from: date, days: int, workers: UOW) -> Calendar:
+    """сетка занятости всех комнат на days ночей от date_from
 
-def get_rooms(workers: UOW) -> List[Room]:
+    один запрос комнат с бронями периода, ячейки заполняются в numpy
+    """
+    if not 0 < days <= MAX_CALENDAR_DAYS:
+        raise DatesNotValid(f"Календарь строится на 1 - {MAX_CALENDAR_DAYS} дней")
     with workers as worker:
-        manager = RoomManager.init(worker.data.all())
-        return manager.rooms.values()
+        rows = worker.data.calendar_rows(date_from, date_from + timedelta(days=days))
+    return Calendar.build(date_from, days, rows)
 
 
-def get_room_orders(num: int, workers: UOW) -> List[dict]:
+def get_room_by_num(num: int, workers: UOW) -> RoomView:
     with workers as worker:
-        manager = RoomManager.init(worker.data.all())
-        room = manager.get_room_by_num(num)
-        res = []
-        for order in room.orders:
-            res.append(order.get_dict)
-        return res
+        return _get_room_view(num, worker)
 
 
-def check_room(num: int, arrival: date, departure: date, workers: UOW) -> Room:
+def get_rooms(workers: UOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    """страница комнат по номеру из справочника в памяти"""
     with workers as worker:
-        manager = RoomManager.init(worker.data.all())
-        dates = (BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE))
-        return manager.check_room(num, dates)
+        return _get_catalog(worker).page(after, limit)
 
 
-def create_order(arrival: date, departure: date, workers: UOW):
+def get_room_orders(num: int, workers: UOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    """страница броней комнаты по номеру брони"""
     with workers as worker:
-        manager = OrderManager.init(worker.data.all())
-        dates = (BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE))
-        order = manager.create(dates)
-        worker.commit()
-        return order
+        _get_room_view(num, worker)
+        return worker.data.orders_page(num, after, limit)
 
 
 def delete_order(order_id, workers: UOW):
     with workers as worker:
-        manager = OrderManager.init(worker.data.all())
+        manager = _get_order_manager(order_id, worker, with_room=True)
         order = manager.get_order_by_id(order_id)
+        capacity = order.room.capacity
         if manager.check_can_delete(order):
             worker.data.delete(order)
         else:
             message = "Бронь можно отменить только за три дня до заезда"
             raise OrderNotCancel(message)
+        released = (order.identity, order.arrival, order.departure)
         worker.commit()
+        availability.released(*released)
+        invalidate_search(capacity, *released[1:])
 
 
-def booking(num:  int, arrival: date, departure: date, room_worker: UOW, order_worker: UOW) -> int:
-    room = check_room(num, arrival, departure, workers=room_worker)
-    order = create_order(arrival, departure, workers=order_worker)
-    identity = order.identity
-    room.orders.append(order)
-    with room_worker as worker:
-        worker.data.add(room)
+def export_orders(date_from: date, date_to: date, fmt: str, workers: UOW) -> Iterator[str]:
+    """выгрузка броней за период кусками текста
+
+    проверка аргументов сразу, а запрос к бд только при чтении итератора,
+    чтобы ошибка ушла обычным ответом до начала потока
+    """
+    check_export(date_from, date_to, fmt)
+    encode = ENCODERS[fmt]
+
+    def chunks():
+        yield HEADERS[fmt]()
+        with workers as worker:
+            for batch in worker.data.stream_range(date_from, date_to):
+                yield encode(batch)
+
+    return chunks()
+
+
+@retry_on_conflict()
+def booking(num: int, arrival: date, departure: date, workers: UOW) -> int:
+    """бронирование одной транзакцией
+
+    строка комнаты блокируется до коммита, поэтому параллельные брони
+    одной комнаты проверяют пересечение по очереди
+    """
+    with workers as worker:
+        manager = _get_room_manager(num, worker, with_orders=True, for_update=True)
+        dates = (BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE))
+        room = manager.check_room(num, dates)
+        order = OrderManager({}).create(dates, identity=worker.data.next_order_identity())
+        room.add_order(order)
+        identity, capacity = order.identity, room.capacity
         worker.commit()
-    return identity
+        availability.booked(num, identity, arrival, departure)
+        invalidate_search(capacity, arrival, departure)
+        return identity
@@ -0,0 +1,270 @@
+"""асинхронные версии сервисов hotel.py для AsyncSqlAlchemyUOW
+
+доменная логика та же, отличается только работа с бд
+"""
+from datetime import date, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+from hotel_california.adapters.repository import DEFAULT_PAGE_SIZE, OrderView, Page, RoomView
+from hotel_california.config import get_settings
+from hotel_california.domain.occupancy import MAX_CALENDAR_DAYS, Calendar, OccupancyMap
+from hotel_california.domain.models import (
+    BookingDate,
+    OrderManager,
+    RefreshToken,
+    RoomManager,
+    Status,
+    User,
+    UserManager,
+)
+from hotel_california.service_layer.exceptions import (
+    AuthenticationJwtError,
+    DatesNotValid,
+    InvalidPassword,
+    NonUniqEmail,
+    OrderNotCancel,
+    OrderNotFound,
+    RoomExistError,
+    RoomNotFound,
+)
+from hotel_california.service_layer.availability import availability
+from hotel_california.service_layer.catalog import ROOMS, RoomCatalog, room_catalog
+from hotel_california.service_layer.cache import invalidate_search, search_cache
+from hotel_california.service_layer.export import ENCODERS, HEADERS, check_export
+from hotel_california.service_layer.passwords import password_pool
+from hotel_california.service_layer.unit_of_work import AsyncUOW, retry_on_conflict
+
+settings = get_settings()
+
+
+async def _get_user_manager(email: str, worker: AsyncUOW) -> UserManager:
+    user = await worker.data.get(email)
+    return UserManager({email: user} if user else {}, passwords=password_pool)
+
+
+async def _login(manager: UserManager, email: str, password: str) -> User:
+    """UserManager.login, но bcrypt ожидается без блокировки event loop"""
+    user = manager.exists(email)
+    if not await password_pool.verify_async(password, user.password):
+        raise InvalidPassword(email=email)
+    return user
+
+
+async def _get_room_manager(
+        num: int, worker: AsyncUOW, with_orders: bool = False, for_update: bool = False
+) -> RoomManager:
+    room = await worker.data.get(num, with_orders=with_orders, for_update=for_update)
+    return RoomManager({num: room} if room else {})
+
+
+async def _get_catalog(worker: AsyncUOW) -> RoomCatalog:
+    version = await worker.data.catalog_version(ROOMS) if settings.CATALOG.version_check else None
+    catalog = room_catalog.get(version)
+    if catalog is None:
+        generation = room_catalog.generation
+        catalog = RoomCatalog(await worker.data.catalog())
+        room_catalog.set(catalog, version, generation)
+    return catalog
+
+
+async def _get_room_view(num: int, worker: AsyncUOW) -> RoomView:
+    room = (await _get_catalog(worker)).get(num)
+    if room is None:
+        room = await worker.data.get_view(num)
+        if room is None:
+            raise RoomNotFound(num)
+        room_catalog.invalidate()
+    return room
+
+
+async def _get_order_manager(order_id: int, worker: AsyncUOW, with_room: bool = False) -> OrderManager:
+    order = await worker.data.get(order_id, with_room=with_room)
+    return OrderManager({order_id: order} if order else {})
+
+
+async def _get_occupancy(worker: AsyncUOW) -> OccupancyMap:
+    occupancy = availability.current()
+    if occupancy is None:
+        generation = availability.generation
+        rows = await worker.data.occupancy_rows(*availability.window())
+        occupancy = availability.install(*rows, generation)
+    return occupancy
+
+
+def _parse_dates(arrival: date, departure: date) -> Tuple[BookingDate, BookingDate]:
+    return BookingDate.parse_str(arrival, Status.ARRIVAL), BookingDate.parse_str(departure, Status.DEPARTURE)
+
+
+async def add_user(name: str, email: str, password: str, is_admin: bool, workers: AsyncUOW):
+    async with workers as worker:
+        if await worker.data.exists(email):
+            raise NonUniqEmail(email)
+        manager = UserManager({}, passwords=password_pool)
+        password_hash = await password_pool.hash_async(password)
+        u = manager.create_with_hash(name, email, password_hash, is_admin)
+        worker.data.add(u)
+        await worker.commit()
+
+
+async def get_user_by_email(email: str, workers: AsyncUOW):
+    async with workers as worker:
+        manager = await _get_user_manager(email, worker)
+        return manager.get_user_by_email(email)
+
+
+async def get_users(workers: AsyncUOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    async with workers as worker:
+        return await worker.data.page(after, limit)
+
+
+async def login_user_and_get_tokens(email: str, password: str, workers: AsyncUOW) -> Tuple[str, str]:
+    async with workers as worker:
+        manager = await _get_user_manager(email, worker)
+        user = await _login(manager, email, password)
+        access = manager.get_access_token(email)
+        refresh = manager.get_refresh_token(email)
+        user.token = RefreshToken(value=refresh)
+        worker.data.add(user)
+        await worker.commit()
+        return access, refresh
+
+
+async def get_access_token(email: str, password: str, workers: AsyncUOW) -> str:
+    async with workers as worker:
+        manager = await _get_user_manager(email, worker)
+        await _login(manager, email, password)
+        return manager.get_access_token(email)
+
+
+async def refresh_token(email: str, workers: AsyncUOW) -> Tuple[str, str]:
+    async with workers as worker:
+        manager = await _get_user_manager(email, worker)
+        user = manager.get_user_by_email(email)
+        if not user.token:
+            message = "Refresh token alredy used"
+            raise AuthenticationJwtError(message)
+        access = manager.get_access_token(user.email)
+        refresh = manager.get_refresh_token(user.email)
+        user.token = RefreshToken(value=refresh)
+        worker.data.add(user)
+        await worker.commit()
+        return access, refresh
+
+
+async def add_room(number: int, capacity: int, price: float, workers: AsyncUOW) -> int:
+    """добавление комнаты"""
+    async with workers as worker:
+        if await worker.data.exists(number):
+            raise RoomExistError(number)
+        manager = RoomManager({})
+        room = manager.create(number, capacity, price)
+        worker.data.add(room)
+        if settings.CATALOG.version_check:
+            await worker.data.bump_catalog_version(ROOMS)
+        await worker.commit()
+        room_catalog.invalidate()
+        availability.room_added(number, capacity, price)
+        invalidate_search(capacity)
+        return room.number
+
+
+async def get_order_by_id(order_id: int, workers: AsyncUOW) -> OrderView:
+    async with workers as worker:
+        view = await worker.data.get_view(order_id)
+        if view is None:
+            raise OrderNotFound(order_id)
+        return view
+
+
+async def find_rooms(cap: int, arrival: date, departure: date, workers: AsyncUOW) -> List[RoomView]:
+    """см. hotel.find_rooms"""
+    key = (cap, arrival, departure)
+    rooms = search_cache.get(key)
+    if rooms is None:
+        # бронь или отмена во время поиска сбрасывает кэш, тогда результат не сохраняется
+        generation = search_cache.generation
+        rooms = await _find_rooms(cap, arrival, departure, workers)
+        search_cache.set(key, rooms, generation=generation)
+    return list(rooms)
+
+
+async def _find_rooms(cap: int, arrival: date, departure: date, workers: AsyncUOW) -> Tuple[RoomView, ...]:
+    async with workers as worker:
+        if availability.enabled:
+            occupancy = await _get_occupancy(worker)
+            if occupancy.covers(arrival, departure):
+                return tuple(RoomView._make(i) for i in occupancy.find_free(cap, arrival, departure))
+        return tuple(await worker.data.find_free(cap, arrival, departure))
+
+
+async def get_calendar(date_from: date, days: int, workers: AsyncUOW) -> Calendar:
+    """см. hotel.get_calendar"""
+    if not 0 < days <= MAX_CALENDAR_DAYS:
+        raise DatesNotValid(f"Календарь строится на 1 - {MAX_CALENDAR_DAYS} дней")
+    async with workers as worker:
+        rows = await worker.data.calendar_rows(date_from, date_from + timedelta(days=days))
+    return Calendar.build(date_from, days, rows)
+
+
+async def get_room_by_num(num: int, workers: AsyncUOW) -> RoomView:
+    async with workers as worker:
+        return await _get_room_view(num, worker)
+
+
+async def get_rooms(workers: AsyncUOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    async with workers as worker:
+        return (await _get_catalog(worker)).page(after, limit)
+
+
+async def get_room_orders(
+    num: int, workers: AsyncUOW, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Page:
+    async with workers as worker:
+        await _get_room_view(num, worker)
+        return await worker.data.orders_page(num, after, limit)
+
+
+async def delete_order(order_id, workers: AsyncUOW):
+    async with workers as worker:
+        manager = await _get_order_manager(order_id, worker, with_room=True)
+        order = manager.get_order_by_id(order_id)
+        capacity = order.room.capacity
+        if manager.check_can_delete(order):
+            await worker.data.delete(order)
+        else:
+            message = "Бронь можно отменить только за три дня до заезда"
+            raise OrderNotCancel(message)
+        released = (order.identity, order.arrival, order.departure)
+        await worker.commit()
+        availability.released(*released)
+        invalidate_search(capacity, *released[1:])
+
+
+def export_orders(date_from: date, date_to: date, fmt: str, workers: AsyncUOW) -> AsyncIterator[str]:
+    """см. hotel.export_orders, итератор асинхронный"""
+    check_export(date_from, date_to, fmt)
+    encode = ENCODERS[fmt]
+
+    async def chunks():
+        yield HEADERS[fmt]()
+        async with workers as worker:
+            async for batch in worker.data.stream_range(date_from, date_to):
+                yield encode(batch)
+
+    return chunks()
+
+
+@retry_on_conflict()
+async def booking(num: int, arrival: date, departure: date, workers: AsyncUOW) -> int:
+    """бронирование одной транзакцией, см. hotel.booking"""
+    async with workers as worker:
+        manager = await _get_room_manager(num, worker, with_orders=True, for_update=True)
+        dates = _parse_dates(arrival, departure)
+        room = manager.check_room(num, dates)
+        order = OrderManager({}).create(dates, identity=await worker.data.next_order_identity())
+        room.add_order(order)
+        identity, capacity = order.identity, room.capacity
+        await worker.commit()
+        availability.booked(num, identity, arrival, departure)
+        invalidate_search(capacity, arrival, departure)
+        return identity
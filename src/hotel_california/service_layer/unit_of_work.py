@@ -1,5 +1,11 @@
+import asyncio
+import random
+import time
 from abc import ABC, abstractmethod
+from functools import wraps
 
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.session import Session
 
 from hotel_california.adapters.repository import AbstractRepository
@@ -7,6 +13,12 @@ from hotel_california.config import get_settings
 
 settings = get_settings()
 
+# serialization_failure, deadlock_detected
+RETRYABLE_PGCODES = {"40001", "40P01"}
+# номер брони без последовательности (sqlite) считается как max + 1 и не защищен
+# блокировкой комнаты, параллельная бронь другой комнаты может занять его первой
+RETRYABLE_UNIQUE = ("ix_orders_identity", "orders.identity")
+
 
 class UOW(ABC):
     data: AbstractRepository
@@ -61,3 +73,83 @@ class SqlAlchemyUOW(UOW):
 
     def rollback(self):
         self.session.rollback()
+
+
+class AsyncUOW(ABC):
+    data: AbstractRepository
+
+    @abstractmethod
+    async def commit(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rollback(self):
+        raise NotImplementedError
+
+    async def __aenter__(self):
+        raise NotImplementedError
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.rollback()
+
+
+class AsyncSqlAlchemyUOW(AsyncUOW):
+    def __init__(
+        self, repo: AbstractRepository, session: AsyncSession
+    ):
+        self.session = session
+        self.data = repo(self.session)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.session.close()
+
+    async def commit(self):
+        await self.session.commit()
+
+    async def rollback(self):
+        await self.session.rollback()
+
+
+def is_retryable(err: DBAPIError) -> bool:
+    """конфликт конкурентных транзакций, который имеет смысл повторить"""
+    if getattr(err.orig, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    return isinstance(err, IntegrityError) and any(name in str(err.orig) for name in RETRYABLE_UNIQUE)
+
+
+def retry_on_conflict(attempts: int = 5, base_delay: float = 0.02, max_delay: float = 0.5):
+    """повтор транзакции при serialization failure/deadlock или занятом номере брони
+
+    экспоненциальная задержка с джиттером, не больше attempts попыток
+    """
+    def get_delay(attempt: int) -> float:
+        delay = min(max_delay, base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapped(*args, **kwargs):
+                for attempt in range(attempts):
+                    try:
+                        return await func(*args, **kwargs)
+                    except DBAPIError as err:
+                        if not is_retryable(err) or attempt == attempts - 1:
+                            raise
+                        await asyncio.sleep(get_delay(attempt))
+            return async_wrapped
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except DBAPIError as err:
+                    if not is_retryable(err) or attempt == attempts - 1:
+                        raise
+                    time.sleep(get_delay(attempt))
+        return wrapped
+    return decorator
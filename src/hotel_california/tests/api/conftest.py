@@ -0,0 +1,62 @@
+"""общие фикстуры api тестов: администратор, токены и отель с бронями"""
+import json
+from datetime import date, timedelta
+
+import pytest
+from requests.auth import AuthBase
+
+from hotel_california.adapters.repository import RoomRepository, UserRepository
+from hotel_california.service_layer.service.hotel import add_room, add_user, booking
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+PAYLOAD = {'email': "test@email.com", "password": "12345678"}
+ADMIN = {
+    "name": "test_user",
+    "email": "test@email.com",
+    "password": "12345678",
+}
+ARRIVAL = date.today() + timedelta(days=30)
+
+
+class JWTAuth(AuthBase):
+    """JWTAuth"""
+
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, r):
+        r.headers['Authorization'] = "Bearer " + self.token
+        return r
+
+
+def get_tokens(client):
+    response = client.post("/users/login", data=json.dumps(PAYLOAD))
+    return response.json()
+
+
+@pytest.fixture()
+def admin(dbsession):
+    worker = SqlAlchemyUOW(repo=UserRepository, session=dbsession)
+
+    add_user(ADMIN['name'], ADMIN['email'], ADMIN['password'], is_admin=True, workers=worker)
+
+
+@pytest.fixture(params=[1, 20], ids=["rooms=1", "rooms=20"])
+def hotel(request, dbsession, admin):
+    """комнаты 1..N вместимостью 2, в каждой по две брони"""
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    for number in range(1, request.param + 1):
+        add_room(number, 2, 100, workers=worker)
+        booking(number, ARRIVAL, ARRIVAL + timedelta(days=2), worker)
+        booking(number, ARRIVAL + timedelta(days=5), ARRIVAL + timedelta(days=7), worker)
+    return request.param
+
+
+@pytest.fixture
+def auth(client, admin):
+    return JWTAuth(get_tokens(client)["access"])
+
+
+@pytest.fixture
+def cookies(client, admin):
+    return {"Authorization": f"Bearer {get_tokens(client)['access']}"}
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from hotel_california.adapters.repository import RoomRepository
+from hotel_california.service_layer.service.hotel import add_room, booking
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+ARRIVAL = date.today() + timedelta(days=10)
+
+
+def test_calendar(client, dbsession, auth):
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    add_room(1, 2, 100, workers=worker)
+    add_room(2, 1, 50, workers=worker)
+    first = booking(1, ARRIVAL, ARRIVAL + timedelta(days=2), worker)
+    second = booking(1, ARRIVAL + timedelta(days=2), ARRIVAL + timedelta(days=5), worker)
+
+    response = client.get("/rooms/calendar", params={"date_from": ARRIVAL - timedelta(days=1), "days": 7}, auth=auth)
+    assert response.status_code == 200
+    assert response.json() == {
+        "date_from": (ARRIVAL - timedelta(days=1)).isoformat(),
+        "days": 7,
+        "rooms": [
+            {"number": 1, "capacity": 2, "price": 100.0, "runs": [[0, 1], [first, 2], [second, 3], [0, 1]]},
+            {"number": 2, "capacity": 1, "price": 50.0, "runs": [[0, 7]]},
+        ],
+    }
+
+
+def test_calendar_days_limit(client, auth):
+    response = client.get("/rooms/calendar", params={"date_from": ARRIVAL, "days": 91}, auth=auth)
+    assert response.status_code == 400
+
+
+def test_calendar_compact(client, dbsession, auth):
+    """1000 комнат x 90 дней укладываются в десятки килобайт"""
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    for number in range(1, 1001):
+        add_room(number, 2, 100, workers=worker)
+        booking(number, ARRIVAL, ARRIVAL + timedelta(days=7), worker)
+    response = client.get("/rooms/calendar", params={"date_from": date.today(), "days": 90}, auth=auth)
+    assert len(response.json()["rooms"]) == 1000
+    assert len(response.content) < 100 * 1024
+
+
+def test_admin_calendar(client, dbsession, cookies):
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    add_room(1, 2, 100, workers=worker)
+    identity = booking(1, ARRIVAL, ARRIVAL + timedelta(days=2), worker)
+    response = client.get("/admin/calendar", cookies=cookies)
+    assert response.status_code == 200
+    assert f'<td colspan="2" class="table-danger">{identity}</td>' in response.text
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from hotel_california.adapters.repository import RoomRepository
+from hotel_california.service_layer.service.hotel import booking
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+from hotel_california.tests.api.conftest import ARRIVAL
+
+
+def period(start_offset: int, end_offset: int) -> dict:
+    return {
+        "date_from": (ARRIVAL + timedelta(days=start_offset)).isoformat(),
+        "date_to": (ARRIVAL + timedelta(days=end_offset)).isoformat(),
+    }
+
+
+def test_export_ndjson(client, hotel, auth):
+    # вторая бронь каждой комнаты: ARRIVAL+5 .. ARRIVAL+7
+    response = client.get("/export/orders", params=period(3, 6), auth=auth)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [i["room"] for i in rows] == list(range(1, hotel + 1))
+    assert rows[0] == {
+        "identity": 2,
+        "room": 1,
+        "arrival": (ARRIVAL + timedelta(days=5)).isoformat(),
+        "departure": (ARRIVAL + timedelta(days=7)).isoformat(),
+    }
+
+
+def test_export_csv(client, hotel, auth):
+    response = client.get("/export/orders", params={**period(0, 30), "format": "csv"}, auth=auth)
+    assert response.status_code == 200
+    assert "orders_" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["identity", "room", "arrival", "departure"]
+    assert len(rows) == 1 + 2 * hotel
+
+
+def test_export_bad_period(client, hotel, auth):
+    response = client.get("/export/orders", params=period(5, 5), auth=auth)
+    assert response.status_code == 422
+
+
+def test_export_zero_night_booking(client, dbsession, hotel, auth):
+    # бронь без ночей на date_from занимает этот день, как в поиске и календаре
+    day = ARRIVAL + timedelta(days=10)
+    identity = booking(1, day, day, SqlAlchemyUOW(repo=RoomRepository, session=dbsession))
+    response = client.get("/export/orders", params=period(10, 12), auth=auth)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"identity": identity, "room": 1, "arrival": day.isoformat(), "departure": day.isoformat()}]
@@ -0,0 +1,57 @@
+import json
+from datetime import date
+
+from hotel_california.entrypoints.app.metrics import DB_QUERIES, LATENCY, REQUESTS, Histogram
+from hotel_california.service_layer.cache import invalidate_search, search_cache
+from hotel_california.tests.api.conftest import PAYLOAD
+
+
+def test_histogram_render():
+    histogram = Histogram("latency", "doc", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, ("/a",))
+    histogram.observe(0.5, ("/a",))
+    histogram.observe(5, ("/a",))
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP latency doc", "# TYPE latency histogram"]
+    assert 'latency_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_count{route="/a"} 3' in lines
+
+
+def test_metrics_by_route_template(admin, client):
+    labels = ("POST", "/users/login")
+    requests_before = REQUESTS.get(labels + ("200",))
+    latency_before = LATENCY.count(labels)
+    queries_before = DB_QUERIES.get(labels)
+
+    response = client.post("/users/login", data=json.dumps(PAYLOAD))
+    assert response.status_code == 200
+    client.get("/orders/1", headers={"Authorization": "Bearer " + response.json()["access"]})
+
+    assert REQUESTS.get(labels + ("200",)) == requests_before + 1
+    assert LATENCY.count(labels) == latency_before + 1
+    # пользователь и запись refresh токена
+    assert DB_QUERIES.get(labels) > queries_before
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="POST",route="/users/login",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/orders/{order_id}",le="+Inf"}' in body
+    assert 'db_queries_total{method="GET",route="/orders/{order_id}"}' in body
+    assert "http_requests_in_progress" in body
+
+
+def test_cache_metrics(client):
+    search_cache.set((2, date(2000, 1, 1), date(2000, 1, 3)), ())
+    search_cache.get((2, date(2000, 1, 1), date(2000, 1, 3)))
+    search_cache.get((1, date(2000, 1, 1), date(2000, 1, 3)))
+    invalidate_search(2, date(2000, 1, 2), date(2000, 1, 5))
+
+    lines = client.get("/metrics").text.splitlines()
+    stats = search_cache.stats
+    assert f'cache_hits_total{{cache="search"}} {stats["hits"]}' in lines
+    assert f'cache_invalidations_total{{cache="search"}} {stats["invalidations"]}' in lines
+    assert 'cache_size{cache="search"} 0' in lines
+    assert "# TYPE cache_hit_ratio gauge" in lines
+    # у справочника нет вытеснения по размеру
+    assert not any(line.startswith('cache_evictions_total{cache="room_catalog"}') for line in lines)
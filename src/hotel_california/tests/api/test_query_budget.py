@@ -0,0 +1,179 @@
+"""бюджеты sql запросов на вызов api, по маршрутам каждого роутера
+
+число запросов не должно зависеть от количества комнат и броней
+"""
+import json
+from datetime import timedelta
+
+from hotel_california.tests.api.conftest import ARRIVAL, PAYLOAD, JWTAuth, get_tokens
+
+
+def dates(offset: int = 0, nights: int = 2) -> dict:
+    arrival = ARRIVAL + timedelta(days=offset)
+    return {"arrival": arrival.isoformat(), "departure": (arrival + timedelta(days=nights)).isoformat()}
+
+
+# auth_router
+
+
+def test_login_budget(client, admin, query_budget):
+    with query_budget(3):
+        response = client.post("/users/login", data=json.dumps(PAYLOAD))
+    assert response.status_code == 200
+
+
+def test_refresh_token_budget(client, admin, query_budget):
+    refresh = get_tokens(client)["refresh"]
+    with query_budget(4):
+        response = client.get("/users/refresh_token", auth=JWTAuth(refresh))
+    assert response.status_code == 200
+
+
+# users_router
+
+
+def test_add_user_budget(client, auth, query_budget):
+    user = {"name": "new_user", "email": "new@email.com", "password": "new_password"}
+    with query_budget(2):
+        response = client.post("/users", data=json.dumps(user), auth=auth)
+    assert response.status_code == 201
+
+
+# rooms_router
+
+
+def test_add_room_budget(client, hotel, auth, query_budget):
+    room = {"number": 100, "capacity": 2, "price": 100}
+    with query_budget(2):
+        response = client.post("/rooms", data=json.dumps(room), auth=auth)
+    assert response.status_code == 201
+
+
+def test_find_rooms_budget(client, hotel, auth, query_budget):
+    with query_budget(1):
+        response = client.get("/rooms", params={"cap": 2, **dates(offset=2, nights=3)}, auth=auth)
+    assert response.status_code == 200
+    assert len(response.json()) == hotel
+
+
+def test_calendar_budget(client, hotel, auth, query_budget):
+    with query_budget(1):
+        response = client.get("/rooms/calendar", params={"date_from": ARRIVAL.isoformat(), "days": 90}, auth=auth)
+    assert len(response.json()["rooms"]) == hotel
+
+
+def test_booking_budget(client, hotel, auth, query_budget):
+    with query_budget(4):
+        response = client.get(f"/rooms/{hotel}/booking", params=dates(offset=10), auth=auth)
+    assert response.status_code == 200
+
+
+def test_room_orders_budget(client, hotel, auth, query_budget):
+    with query_budget(2):
+        response = client.get(f"/rooms/{hotel}/orders", auth=auth)
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_room_orders_next_link(client, hotel, auth):
+    response = client.get(f"/rooms/{hotel}/orders", params={"limit": 1}, auth=auth)
+    assert len(response.json()) == 1
+    identity = response.json()[0]["identity"]
+    assert response.headers["Link"] == f'<http://testserver/rooms/{hotel}/orders?after={identity}&limit=1>; rel="next"'
+    response = client.get(f"/rooms/{hotel}/orders", params={"limit": 1, "after": identity}, auth=auth)
+    assert len(response.json()) == 1
+    assert "Link" not in response.headers
+
+
+def test_order_budget(client, hotel, auth, query_budget):
+    with query_budget(1):
+        response = client.get("/orders/1", auth=auth)
+    assert response.status_code == 200
+
+
+def test_cancel_order_budget(client, hotel, auth, query_budget):
+    with query_budget(2):
+        response = client.get("/orders/1/cancel", auth=auth)
+    assert response.status_code == 204
+
+
+# admin_router
+
+
+def test_admin_login_page_budget(client, query_budget):
+    with query_budget(0):
+        response = client.get("/admin/login")
+    assert response.status_code == 200
+
+
+def test_admin_rooms_budget(client, hotel, cookies, query_budget):
+    with query_budget(1):
+        response = client.get("/admin/rooms", cookies=cookies)
+    assert response.status_code == 200
+
+
+def test_admin_rooms_cached_budget(client, hotel, cookies, query_budget):
+    # справочник комнат уже в памяти
+    client.get("/admin/rooms", cookies=cookies)
+    with query_budget(0):
+        response = client.get("/admin/rooms", cookies=cookies)
+    assert response.status_code == 200
+
+
+def test_admin_rooms_next_page(client, hotel, cookies, query_budget):
+    with query_budget(1):
+        response = client.get("/admin/rooms", params={"limit": 5}, cookies=cookies)
+    assert response.status_code == 200
+    assert ("/admin/rooms?after=5&amp;limit=5" in response.text) == (hotel > 5)
+
+
+def test_admin_calendar_budget(client, hotel, cookies, query_budget):
+    with query_budget(1):
+        response = client.get("/admin/calendar", cookies=cookies)
+    assert response.status_code == 200
+
+
+def test_admin_room_orders_budget(client, hotel, cookies, query_budget):
+    with query_budget(2):
+        response = client.get(f"/admin/rooms/{hotel}/orders", cookies=cookies)
+    assert response.status_code == 200
+
+
+def test_admin_booking_budget(client, hotel, cookies, query_budget):
+    with query_budget(4):
+        response = client.post(
+            f"/admin/rooms/{hotel}/orders/add", data=dates(offset=10), cookies=cookies, allow_redirects=False
+        )
+    assert response.status_code == 303
+
+
+def test_admin_cancel_order_budget(client, hotel, cookies, query_budget):
+    with query_budget(2):
+        response = client.get("/admin/orders/1/cancel", cookies=cookies, allow_redirects=False)
+    assert response.status_code == 303
+
+
+def test_admin_users_budget(client, hotel, cookies, query_budget):
+    with query_budget(1):
+        response = client.get("/admin/users", cookies=cookies)
+    assert response.status_code == 200
+
+
+# export_router
+
+
+def test_export_orders_budget(client, hotel, auth, query_budget):
+    with query_budget(1):
+        response = client.get("/export/orders", params={"date_from": ARRIVAL.isoformat(),
+                                                        "date_to": (ARRIVAL + timedelta(days=30)).isoformat()},
+                              auth=auth)
+    assert len(response.text.splitlines()) == 2 * hotel
+
+
+# metrics_router
+
+
+def test_metrics_budget(client, query_budget):
+    with query_budget(0):
+        response = client.get("/metrics")
+    assert response.status_code == 200
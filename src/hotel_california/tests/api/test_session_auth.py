@@ -0,0 +1,43 @@
+import pytest
+
+from hotel_california.adapters.repository import UserRepository
+from hotel_california.entrypoints.app import auth_session
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+from hotel_california.service_layer.cache import principal_cache
+from hotel_california.tests.api.conftest import get_tokens
+
+
+@pytest.fixture
+def user_loads(monkeypatch, dbsession):
+    calls = []
+    get_user_by_email = auth_session.get_user_by_email
+
+    async def counted(*args, **kwargs):
+        calls.append(args)
+        return await get_user_by_email(*args, **kwargs)
+
+    monkeypatch.setattr(auth_session, "get_user_by_email", counted)
+    # middleware открывает сессию сам, мимо get_db
+    monkeypatch.setattr(auth_session, "new_user_worker", lambda: SqlAlchemyUOW(repo=UserRepository, session=dbsession))
+    principal_cache.clear()
+    yield calls
+    principal_cache.clear()
+
+
+def test_cookie_principal_cached(admin, client, user_loads):
+    tokens = get_tokens(client)
+    cookies = {"Authorization": f"Bearer {tokens['access']}"}
+    hits = principal_cache.hits
+    for _ in range(3):
+        response = client.get("/admin/users", cookies=cookies)
+        assert response.status_code == 200
+    # роль берется из токена, пользователь из бд не загружается
+    assert user_loads == []
+    assert principal_cache.hits - hits == 2
+
+
+def test_static_skips_auth(client, user_loads):
+    cookies = {"Authorization": "Bearer not_a_token"}
+    response = client.get("/static/favicon.ico", cookies=cookies)
+    assert response.status_code == 200
+    assert user_loads == []
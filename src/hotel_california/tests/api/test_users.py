@@ -1,35 +1,11 @@
-import pytest
 import json
-from requests.auth import AuthBase
 
+from hotel_california.service_layer.exceptions import PasswordPoolBusy
+from hotel_california.service_layer.passwords import password_pool
 from hotel_california.service_layer.service.hotel import add_user, decode_token
 from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
 from hotel_california.adapters.repository import UserRepository
-
-PAYLOAD = {'email': "test@email.com", "password": "12345678"}
-ADMIN = {
-    "name": "test_user",
-    "email": "test@email.com",
-    "password": "12345678",
-}
-
-
-class JWTAuth(AuthBase):
-    """JWTAuth"""
-
-    def __init__(self, token):
-        self.token = token
-
-    def __call__(self, r):
-        r.headers['Authorization'] = "Bearer " + self.token
-        return r
-
-
-@pytest.fixture()
-def admin(dbsession):
-    worker = SqlAlchemyUOW(repo=UserRepository, session=dbsession)
-
-    add_user(ADMIN['name'], ADMIN['email'], ADMIN['password'], is_admin=True, workers=worker)
+from hotel_california.tests.api.conftest import ADMIN, PAYLOAD, JWTAuth, get_tokens
 
 
 def test_login(admin, client, engine):
@@ -44,11 +20,6 @@ def test_login(admin, client, engine):
             assert row["value"] == res['refresh']
 
 
-def get_tokens(client):
-    response = client.post("/users/login", data=json.dumps(PAYLOAD))
-    return response.json()
-
-
 def test_create(admin, client, engine):
     tokens = get_tokens(client)
     new_user = {
@@ -65,3 +36,23 @@ def test_create(admin, client, engine):
             assert row["name"] == new_user["name"]
             assert row["email"] == new_user["email"]
             assert row["is_admin"] == new_user["is_admin"]
+
+
+def test_login_password_pool_busy(admin, client, monkeypatch):
+    def busy(*args):
+        raise PasswordPoolBusy(retry_after=2)
+
+    monkeypatch.setattr(password_pool, "_submit", busy)
+    response = client.post("/users/login", data=json.dumps(PAYLOAD))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_create_not_admin(dbsession, client):
+    worker = SqlAlchemyUOW(repo=UserRepository, session=dbsession)
+    add_user(ADMIN['name'], ADMIN['email'], ADMIN['password'], is_admin=False, workers=worker)
+    tokens = get_tokens(client)
+    assert decode_token(tokens['access'])['role'] == 'manager'
+    new_user = {"name": "test3_user", "email": "test3@email.com", "password": "15848484646464646416416"}
+    response = client.post("/users", data=json.dumps(new_user), auth=JWTAuth(tokens['access']))
+    assert response.status_code == 422
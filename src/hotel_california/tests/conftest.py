@@ -1,11 +1,15 @@
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm.session import Session
 
 from hotel_california.adapters.orm import metadata_obj
 from hotel_california.entrypoints.app.main import app
 from hotel_california.entrypoints.app.workers import get_db
+from hotel_california.service_layer.cache import search_cache
+from hotel_california.service_layer.catalog import room_catalog
 
 
 @pytest.fixture(scope="session")
@@ -20,6 +24,16 @@ def tables(engine):
     metadata_obj.drop_all(engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """кэши справочника и поиска в памяти процесса переживают откат транзакции теста"""
+    room_catalog.invalidate()
+    search_cache.clear()
+    yield
+    room_catalog.invalidate()
+    search_cache.clear()
+
+
 @pytest.fixture
 def dbsession(engine, tables):
     """Returns an sqlalchemy session, and after the test tears down everything properly."""
@@ -48,3 +62,36 @@ def client(dbsession):
             db.close()
     app.dependency_overrides[get_db] = override_get_db
     return TestClient(app)
+
+
+@pytest.fixture
+def statements(engine):
+    """список выполненных sql запросов"""
+    res = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        res.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield res
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def query_budget(statements):
+    """проверка числа sql запросов в блоке
+
+        with query_budget(2) as executed:
+            client.get("/rooms", ...)
+
+    executed - запросы выполненные в блоке, падает если их больше бюджета
+    """
+    @contextmanager
+    def budget(limit: int):
+        start = len(statements)
+        executed = []
+        yield executed
+        executed.extend(statements[start:])
+        assert len(executed) <= limit, f"{len(executed)} запросов при бюджете {limit}:\n" + "\n".join(executed)
+
+    return budget
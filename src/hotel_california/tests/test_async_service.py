@@ -0,0 +1,133 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.pool import StaticPool
+
+from hotel_california.adapters.async_repository import (
+    AsyncOrderRepository,
+    AsyncRoomRepository,
+    AsyncUserRepository,
+)
+from hotel_california.adapters.orm import metadata_obj
+from hotel_california.adapters.repository import OrderView, Page, RoomView
+from hotel_california.service_layer.availability import availability
+from hotel_california.service_layer.exceptions import RoomNonFree, RoomNotFound
+from hotel_california.service_layer.service import hotel_async
+from hotel_california.service_layer.unit_of_work import AsyncSqlAlchemyUOW
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+
+async def run_with_session(test):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata_obj.create_all)
+    try:
+        await test(lambda: AsyncSession(engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+
+
+def test_async_booking():
+    async def test(session):
+        def rooms():
+            return AsyncSqlAlchemyUOW(repo=AsyncRoomRepository, session=session())
+
+        await hotel_async.add_room(1, 2, 100, workers=rooms())
+        identity = await hotel_async.booking(1, date(2000, 1, 1), date(2000, 1, 7), workers=rooms())
+        assert identity == 1
+        with pytest.raises(RoomNonFree):
+            await hotel_async.booking(1, date(2000, 1, 5), date(2000, 1, 9), workers=rooms())
+        free = await hotel_async.find_rooms(2, date(2000, 1, 7), date(2000, 1, 9), workers=rooms())
+        assert [i.number for i in free] == [1]
+        orders = await hotel_async.get_room_orders(1, workers=rooms())
+        assert orders.items == [OrderView(1, date(2000, 1, 1), date(2000, 1, 7))]
+
+    asyncio.run(run_with_session(test))
+
+
+def test_async_find_rooms_occupancy(monkeypatch):
+    monkeypatch.setattr(availability, "enabled", True)
+    availability.reset()
+    arrival = date.today() + timedelta(days=10)
+
+    async def test(session):
+        def rooms():
+            return AsyncSqlAlchemyUOW(repo=AsyncRoomRepository, session=session())
+
+        await hotel_async.add_room(1, 2, 100, workers=rooms())
+        await hotel_async.add_room(2, 2, 100, workers=rooms())
+        await hotel_async.booking(1, arrival, arrival + timedelta(days=2), workers=rooms())
+        free = await hotel_async.find_rooms(2, arrival, arrival + timedelta(days=1), workers=rooms())
+        assert [i.number for i in free] == [2]
+        await hotel_async.booking(2, arrival, arrival + timedelta(days=1), workers=rooms())
+        assert await hotel_async.find_rooms(2, arrival, arrival + timedelta(days=1), workers=rooms()) == []
+
+    try:
+        asyncio.run(run_with_session(test))
+    finally:
+        availability.reset()
+
+
+def test_async_calendar():
+    async def test(session):
+        def rooms():
+            return AsyncSqlAlchemyUOW(repo=AsyncRoomRepository, session=session())
+
+        await hotel_async.add_room(1, 2, 100, workers=rooms())
+        await hotel_async.booking(1, date(2000, 1, 2), date(2000, 1, 4), workers=rooms())
+        calendar = await hotel_async.get_calendar(date(2000, 1, 1), 5, workers=rooms())
+        assert calendar.runs() == [[(0, 1), (1, 2), (0, 2)]]
+
+    asyncio.run(run_with_session(test))
+
+
+def test_async_room_catalog():
+    async def test(session):
+        def rooms():
+            return AsyncSqlAlchemyUOW(repo=AsyncRoomRepository, session=session())
+
+        await hotel_async.add_room(2, 2, 100, workers=rooms())
+        await hotel_async.add_room(1, 1, 50, workers=rooms())
+        page = await hotel_async.get_rooms(workers=rooms(), limit=1)
+        assert page == Page([RoomView(1, 1, 50.0)], 1)
+        assert await hotel_async.get_room_by_num(2, workers=rooms()) == RoomView(2, 2, 100.0)
+        with pytest.raises(RoomNotFound):
+            await hotel_async.get_room_by_num(3, workers=rooms())
+
+    asyncio.run(run_with_session(test))
+
+
+def test_async_login():
+    async def test(session):
+        def users():
+            return AsyncSqlAlchemyUOW(repo=AsyncUserRepository, session=session())
+
+        await hotel_async.add_user("test_user", "test@email.com", "12345678", True, workers=users())
+        access, refresh = await hotel_async.login_user_and_get_tokens("test@email.com", "12345678", workers=users())
+        assert access and refresh
+
+    asyncio.run(run_with_session(test))
+
+
+def test_async_export_orders():
+    async def test(session):
+        def rooms():
+            return AsyncSqlAlchemyUOW(repo=AsyncRoomRepository, session=session())
+
+        await hotel_async.add_room(1, 2, 100, workers=rooms())
+        await hotel_async.booking(1, date(2000, 1, 1), date(2000, 1, 7), workers=rooms())
+        await hotel_async.booking(1, date(2000, 2, 1), date(2000, 2, 7), workers=rooms())
+        orders = AsyncSqlAlchemyUOW(repo=AsyncOrderRepository, session=session())
+        chunks = hotel_async.export_orders(date(2000, 1, 5), date(2000, 2, 2), "csv", workers=orders)
+        text = "".join([chunk async for chunk in chunks])
+        assert text.splitlines() == [
+            "identity,room,arrival,departure",
+            "1,1,2000-01-01,2000-01-07",
+            "2,1,2000-02-01,2000-02-07",
+        ]
+
+    asyncio.run(run_with_session(test))
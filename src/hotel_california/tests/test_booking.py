@@ -2,7 +2,7 @@ from datetime import date
 
 import pytest
 
-from hotel_california.domain.models import BookingDate, Room, Order
+from hotel_california.domain.models import BookingDate, Room, Order, OrderManager
 from hotel_california.service_layer.exceptions import RoomNonFree
 from hotel_california.service_layer.service.hotel import Status, RoomManager
 
@@ -18,17 +18,13 @@ def manager():
                 orders=[
                     Order(
                         identity=1,
-                        dates=[
-                            BookingDate(date=date(2000, 1, 1), status=int(Status.ARRIVAL)),
-                            BookingDate(date=date(2000, 1, 7), status=int(Status.DEPARTURE)),
-                        ]
+                        arrival=date(2000, 1, 1),
+                        departure=date(2000, 1, 7),
                     ),
                     Order(
                         identity=2,
-                        dates=[
-                            BookingDate(date=date(2000, 1, 14), status=int(Status.ARRIVAL)),
-                            BookingDate(date=date(2000, 1, 23), status=int(Status.DEPARTURE)),
-                        ]
+                        arrival=date(2000, 1, 14),
+                        departure=date(2000, 1, 23),
                     )
                 ]
             )}
@@ -89,3 +85,48 @@ def test_check_free_room_raise2(manager):
     )
     with pytest.raises(RoomNonFree):
         manager.check_room(1, test_dates)
+
+
+def test_check_free_room_raise3(manager):
+    # запрошенный интервал целиком содержит бронь
+    test_dates = (
+        BookingDate(date=date(2000, 1, 13), status=int(Status.ARRIVAL)),
+        BookingDate(date=date(2000, 1, 25), status=int(Status.DEPARTURE)),
+    )
+    with pytest.raises(RoomNonFree):
+        manager.check_room(1, test_dates)
+
+
+def test_check_free_room_raise4(manager):
+    # бронь целиком содержит запрошенный интервал
+    test_dates = (
+        BookingDate(date=date(2000, 1, 15), status=int(Status.ARRIVAL)),
+        BookingDate(date=date(2000, 1, 20), status=int(Status.DEPARTURE)),
+    )
+    with pytest.raises(RoomNonFree):
+        manager.check_room(1, test_dates)
+
+
+def test_add_order_updates_index(manager):
+    room = manager.get_room_by_num(1)
+    assert room.bookings.is_free(date(2000, 1, 8), date(2000, 1, 10))
+    order = Order(
+        identity=3,
+        arrival=date(2000, 1, 9),
+        departure=date(2000, 1, 11),
+    )
+    room.add_order(order)
+    assert not room.bookings.is_free(date(2000, 1, 8), date(2000, 1, 10))
+    room.remove_order(order)
+    assert room.bookings.is_free(date(2000, 1, 8), date(2000, 1, 10))
+
+
+def test_order_manager_get_id():
+    manager = OrderManager(orders={})
+    assert [manager.get_id(), manager.get_id()] == [1, 2]
+    dates = (
+        BookingDate(date=date(2000, 1, 8), status=int(Status.ARRIVAL)),
+        BookingDate(date=date(2000, 1, 10), status=int(Status.DEPARTURE)),
+    )
+    assert manager.create(dates).identity == 3
+    assert manager.create(dates, identity=42).identity == 42
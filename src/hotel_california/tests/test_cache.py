@@ -0,0 +1,73 @@
+from datetime import date
+
+from hotel_california.service_layer.cache import LRUCache, invalidate_search, search_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats == {"size": 2, "hits": 2, "misses": 1, "evictions": 1, "invalidations": 0}
+
+
+def test_ttl():
+    clock = Clock()
+    cache = LRUCache(maxsize=10, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+    cache.set("c", 3, ttl=100)
+    clock.now = 5
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_invalidate():
+    cache = LRUCache(maxsize=10)
+    for i in range(5):
+        cache.set(i, i * 10)
+    assert cache.invalidate(lambda key, value: value >= 30) == 2
+    assert len(cache) == 3
+    assert cache.invalidations == 2
+
+
+def test_invalidate_search():
+    search_cache.clear()
+    keys = [
+        (2, date(2000, 1, 1), date(2000, 1, 5)),
+        (2, date(2000, 1, 5), date(2000, 1, 9)),
+        (1, date(2000, 1, 1), date(2000, 1, 9)),
+        # без ночей - занимает день заезда
+        (2, date(2000, 1, 4), date(2000, 1, 4)),
+    ]
+    for key in keys:
+        search_cache.set(key, ())
+    assert invalidate_search(2, date(2000, 1, 3), date(2000, 1, 5)) == 2
+    assert search_cache.get(keys[1]) == ()
+    assert search_cache.get(keys[2]) == ()
+    search_cache.clear()
+
+
+def test_set_skipped_after_invalidation():
+    cache = LRUCache(maxsize=10)
+    generation = cache.generation
+    # сброс между чтением generation и записью, даже если он ничего не удалил
+    cache.invalidate(lambda key, value: False)
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
+    cache.set("a", 1, generation=cache.generation)
+    assert cache.get("a") == 1
@@ -0,0 +1,39 @@
+import pytest
+
+from hotel_california.entrypoints.app.main import app
+from hotel_california.entrypoints.commands.loadtest import ROUTES, main, percentile
+
+
+def test_percentile():
+    values = [i / 100 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 95) == 0.95
+    assert percentile(values, 99) == 0.99
+    assert percentile([0.1], 99) == 0.1
+    assert percentile([], 50) == 0.0
+
+
+def test_loadtest_in_process(tmp_path):
+    overrides = dict(app.dependency_overrides)
+    try:
+        report = main([
+            "--db", str(tmp_path / "load.sqlite3"),
+            "--requests", "30",
+            "--concurrency", "1",
+            "--rooms", "5",
+            "--mix", "search=4,booking=3,order=2,cancel=1",
+            "--output", str(tmp_path / "report.json"),
+        ])
+    finally:
+        app.dependency_overrides = overrides
+    assert report["requests"] == 30
+    assert set(report["routes"]) <= {ROUTES[i] for i in ("search", "booking", "order", "cancel")}
+    for route in report["routes"].values():
+        assert route["errors"] == 0
+        assert route["p50_ms"] <= route["p95_ms"] <= route["p99_ms"] <= route["max_ms"]
+    assert (tmp_path / "report.json").exists()
+
+
+def test_loadtest_url_requires_allow_writes():
+    with pytest.raises(SystemExit):
+        main(["--url", "http://localhost:8000"])
@@ -0,0 +1,151 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from hotel_california.adapters import repository
+from hotel_california.adapters.repository import OrderRepository, RoomRepository, RoomView
+from hotel_california.domain.models import BookingIndex, Order
+from hotel_california.domain.occupancy import Calendar, OccupancyMap
+from hotel_california.service_layer.availability import availability
+from hotel_california.service_layer.exceptions import RoomExistError, RoomNotFound
+from hotel_california.service_layer.service.hotel import add_room, booking, delete_order, find_rooms
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+START = date(2000, 1, 1)
+
+
+def day(offset: int) -> date:
+    return START + timedelta(days=offset)
+
+
+@pytest.fixture
+def occupancy():
+    rooms = [(2, 2, 100.0), (1, 2, 100.0), (3, 1, 50.0)]
+    orders = [(1, 1, day(0), day(6)), (2, 2, day(13), day(22)), (3, 3, day(-10), day(-5))]
+    return OccupancyMap.build(START, 30, rooms, orders)
+
+
+def numbers(rows):
+    return [i[0] for i in rows]
+
+
+def test_find_free(occupancy):
+    assert occupancy.find_free(2, day(0), day(6)) == [(2, 2, 100.0)]
+    assert numbers(occupancy.find_free(2, day(6), day(13))) == [1, 2]
+    assert numbers(occupancy.find_free(2, day(5), day(14))) == []
+    assert numbers(occupancy.find_free(1, day(0), day(1))) == [3]
+
+
+def test_outside_window(occupancy):
+    assert not occupancy.covers(day(-1), day(2))
+    assert not occupancy.covers(day(25), day(31))
+    with pytest.raises(ValueError):
+        occupancy.find_free(2, day(25), day(31))
+
+
+def test_book_release(occupancy):
+    occupancy.book(2, 4, day(1), day(3))
+    assert not occupancy.is_free(2, day(2), day(3))
+    assert numbers(occupancy.find_free(2, day(0), day(2))) == []
+    assert occupancy.release(4, day(1), day(3)) == 2
+    assert occupancy.is_free(2, day(0), day(13))
+    # бронь вне окна не учитывается
+    occupancy.book(2, 5, day(40), day(42))
+    assert occupancy.release(5, day(40), day(42)) is None
+    with pytest.raises(RoomNotFound):
+        occupancy.book(42, 6, day(1), day(3))
+
+
+def test_add_room(occupancy):
+    occupancy.add_room(0, 2, 10.0)
+    occupancy.add_room(10, 2, 10.0)
+    assert numbers(occupancy.find_free(2, day(0), day(6))) == [0, 2, 10]
+    with pytest.raises(RoomExistError):
+        occupancy.add_room(1, 2, 10.0)
+
+
+def test_same_as_booking_index():
+    """та же семантика пересечений что у BookingIndex, включая брони без ночей"""
+    rng = random.Random(42)
+    rooms = [(number, 1, 100.0) for number in range(1, 51)]
+    orders, indexes = [], {}
+    for number, *_ in rooms:
+        room_orders = []
+        for _ in range(rng.randint(0, 5)):
+            arrival = day(rng.randint(-5, 35))
+            room_orders.append(Order(len(orders) + 1, arrival, arrival + timedelta(days=rng.randint(0, 4))))
+            orders.append((len(orders) + 1, number, room_orders[-1].arrival, room_orders[-1].departure))
+        indexes[number] = BookingIndex(room_orders)
+    occupancy = OccupancyMap.build(START, 30, rooms, orders)
+    for _ in range(200):
+        arrival = day(rng.randint(0, 28))
+        departure = arrival + timedelta(days=rng.randint(0, 30 - (arrival - START).days))
+        expected = [number for number, index in indexes.items() if index.is_free(arrival, departure)]
+        assert numbers(occupancy.find_free(1, arrival, departure)) == expected
+
+
+@pytest.fixture
+def engine_on(monkeypatch):
+    monkeypatch.setattr(availability, "enabled", True)
+    availability.reset()
+    yield availability
+    availability.reset()
+
+
+@pytest.fixture
+def rooms(dbsession):
+    return SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+
+
+def test_find_rooms_from_memory(dbsession, rooms, engine_on, statements):
+    arrival = date.today() + timedelta(days=10)
+    departure = arrival + timedelta(days=2)
+    add_room(1, 2, 100, workers=rooms)
+    add_room(2, 2, 100, workers=rooms)
+    booking(1, arrival, departure, rooms)
+    assert find_rooms(2, arrival, departure, workers=rooms) == [RoomView(2, 2, 100.0)]
+
+    # матрица собрана, дальше поиск без запросов к бд, изменения этого процесса видны сразу
+    identity = booking(2, arrival, departure, rooms)
+    add_room(3, 2, 100, workers=rooms)
+    executed = len(statements)
+    assert find_rooms(2, arrival, departure, workers=rooms) == [RoomView(3, 2, 100.0)]
+    assert len(statements) == executed
+
+    delete_order(identity, workers=SqlAlchemyUOW(repo=OrderRepository, session=dbsession))
+    executed = len(statements)
+    assert find_rooms(2, arrival, departure, workers=rooms) == [RoomView(2, 2, 100.0), RoomView(3, 2, 100.0)]
+    assert len(statements) == executed
+
+
+def test_occupancy_rows_skip_unread_rooms(dbsession, rooms, monkeypatch):
+    add_room(1, 2, 100, workers=rooms)
+    add_room(2, 2, 100, workers=rooms)
+    booking(1, day(1), day(3), rooms)
+    booking(2, day(1), day(3), rooms)
+    # комната 2 и ее бронь закоммичены между чтением комнат и чтением броней
+    room_views = repository.room_views
+    monkeypatch.setattr(repository, "room_views", lambda: room_views().where(repository.rooms.c.number != 2))
+    room_rows, order_rows = RoomRepository(dbsession).occupancy_rows(day(0), day(30))
+    assert [i.number for i in room_rows] == [1]
+    assert [i[1] for i in order_rows] == [1]
+
+
+def test_calendar_runs():
+    rows = [
+        (1, 2, 100.0, 1, day(-2), day(2)),
+        (1, 2, 100.0, 2, day(2), day(4)),
+        (2, 2, 100.0, None, None, None),
+        (3, 1, 50.0, 3, day(5), day(5)),
+        (3, 1, 50.0, 4, day(8), day(12)),
+    ]
+    calendar = Calendar.build(START, 10, rows)
+    assert calendar.rooms == [(1, 2, 100.0), (2, 2, 100.0), (3, 1, 50.0)]
+    assert calendar.grid[0].tolist() == [1, 1, 2, 2, 0, 0, 0, 0, 0, 0]
+    assert calendar.runs() == [
+        [(1, 2), (2, 2), (0, 6)],
+        [(0, 10)],
+        [(0, 5), (3, 1), (0, 2), (4, 2)],
+    ]
+    assert Calendar.build(START, 10, []).runs() == []
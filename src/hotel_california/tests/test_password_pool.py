@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from hotel_california.domain.models import UserManager
+from hotel_california.service_layer.exceptions import PasswordPoolBusy
+from hotel_california.service_layer.passwords import PasswordPool
+
+
+class SlowContext:
+    """hash/verify ждут сигнала, чтобы занять пул"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return "hash_" + password
+
+    def verify(self, password_raw, password_hash):
+        self.release.wait(5)
+        return password_hash == "hash_" + password_raw
+
+
+def test_pool_verify():
+    context = SlowContext()
+    context.release.set()
+    pool = PasswordPool(size=1, queue_size=0, context=context)
+    manager = UserManager({}, passwords=pool)
+    user = manager.create("test_user", "test@email.com", "12345678")
+    assert user.password == "hash_12345678"
+    manager = UserManager({user.email: user}, passwords=pool)
+    assert manager.login("test@email.com", "12345678") == user
+
+
+def test_pool_busy():
+    context = SlowContext()
+    pool = PasswordPool(size=1, queue_size=1, retry_after=3, context=context)
+    futures = [pool._submit(context.hash, "1"), pool._submit(context.hash, "2")]
+    with pytest.raises(PasswordPoolBusy) as err:
+        pool.hash("3")
+    assert err.value.retry_after == 3
+    context.release.set()
+    assert [i.result() for i in futures] == ["hash_1", "hash_2"]
+    assert pool.hash("3") == "hash_3"
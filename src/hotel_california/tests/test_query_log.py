@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from hotel_california.adapters.repository import RoomRepository
+from hotel_california.adapters.sqlalchemy_init import QueryLog, statement_scope
+from hotel_california.service_layer.service.hotel import add_room, get_room_orders
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+
+def lazy_load_orders(workers):
+    """ленивая загрузка orders на каждую комнату"""
+    with workers as worker:
+        for (room,) in worker.data.all():
+            room.orders
+
+
+@pytest.fixture
+def query_log(engine):
+    def install(**kwargs):
+        log = QueryLog(**kwargs)
+        log.install(engine)
+        installed.append(log)
+        return log
+
+    installed = []
+    yield install
+    for log in installed:
+        log.remove(engine)
+
+
+def test_slow_query_attributed_to_service(dbsession, query_log, caplog):
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    add_room(1, 2, 100, workers=worker)
+    query_log(slow_query_ms=0)
+    with caplog.at_level(logging.WARNING, logger="hotel_california.sql"):
+        get_room_orders(1, workers=worker)
+    messages = [i.getMessage() for i in caplog.records]
+    assert messages
+    assert all(" in hotel.get_room_orders: " in i for i in messages)
+    assert any("parameters=(1," in i for i in messages)
+
+
+def test_n_plus_one_warning(dbsession, query_log, caplog):
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    for number in range(1, 5):
+        add_room(number, 2, 100, workers=worker)
+    query_log(n_plus_one_threshold=2)
+    with caplog.at_level(logging.WARNING, logger="hotel_california.sql"), statement_scope():
+        lazy_load_orders(worker)
+    warnings = [i.getMessage() for i in caplog.records]
+    assert len(warnings) == 1
+    assert warnings[0].startswith("possible N+1 in unknown: statement executed more than 2 times")
+
+
+def test_no_scope_no_warning(dbsession, query_log, caplog):
+    worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    for number in range(1, 5):
+        add_room(number, 2, 100, workers=worker)
+    query_log(n_plus_one_threshold=2)
+    with caplog.at_level(logging.WARNING, logger="hotel_california.sql"):
+        lazy_load_orders(worker)
+    assert not caplog.records
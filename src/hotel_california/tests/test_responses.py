@@ -0,0 +1,22 @@
+import json
+from datetime import date
+
+from hotel_california.adapters.repository import OrderView, RoomView
+from hotel_california.entrypoints.app.responses import row_serializer, rows_response
+
+
+def test_row_serializer_fields():
+    row = OrderView(1, date(2000, 1, 1), date(2000, 1, 7))
+    assert row_serializer(OrderView)(row) == {"identity": 1, "arrival": date(2000, 1, 1), "departure": date(2000, 1, 7)}
+    assert row_serializer(OrderView, ("departure", "arrival"))(row) == {
+        "departure": date(2000, 1, 7), "arrival": date(2000, 1, 1)
+    }
+    assert row_serializer(OrderView, ("identity",))(row) == {"identity": 1}
+
+
+def test_rows_response_matches_schema():
+    response = rows_response([RoomView(1, 2, 100.0)], row_serializer(RoomView), headers={"Link": "<x>"})
+    assert json.loads(response.body) == [{"number": 1, "capacity": 2, "price": 100.0}]
+    assert response.headers["Link"] == "<x>"
+    order = rows_response([OrderView(1, date(2000, 1, 1), date(2000, 1, 7))], row_serializer(OrderView))
+    assert json.loads(order.body) == [{"identity": 1, "arrival": "2000-01-01", "departure": "2000-01-07"}]
@@ -0,0 +1,276 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm.session import Session
+
+from hotel_california.adapters.repository import OrderRepository, OrderView, RoomRepository, RoomView
+from hotel_california.adapters.orm import metadata_obj
+from hotel_california.config import get_settings
+from hotel_california.domain.models import Room
+from hotel_california.service_layer.cache import invalidate_search, search_cache
+from hotel_california.service_layer.catalog import ROOMS
+from hotel_california.service_layer.exceptions import OrderNotFound, RoomExistError, RoomNonFree, RoomNotFound
+from hotel_california.service_layer.service.hotel import (
+    add_room,
+    booking,
+    delete_order,
+    find_rooms,
+    get_order_by_id,
+    get_room_by_num,
+    get_room_orders,
+    get_rooms,
+)
+from hotel_california.service_layer.unit_of_work import SqlAlchemyUOW
+
+settings = get_settings()
+
+
+@pytest.fixture
+def rooms(dbsession):
+    room_worker = SqlAlchemyUOW(repo=RoomRepository, session=dbsession)
+    add_room(1, 2, 100, workers=room_worker)
+    add_room(2, 2, 100, workers=room_worker)
+    add_room(3, 1, 100, workers=room_worker)
+    booking(1, date(2000, 1, 1), date(2000, 1, 7), room_worker)
+    booking(2, date(2000, 1, 14), date(2000, 1, 23), room_worker)
+    return room_worker
+
+
+@pytest.fixture
+def orders(rooms, dbsession):
+    return SqlAlchemyUOW(repo=OrderRepository, session=dbsession)
+
+
+def numbers(res):
+    return [i.number for i in res]
+
+
+def test_find_free_capacity(rooms):
+    assert numbers(find_rooms(1, date(2000, 1, 1), date(2000, 1, 7), workers=rooms)) == [3]
+
+
+def test_find_free_overlap(rooms):
+    assert numbers(find_rooms(2, date(2000, 1, 6), date(2000, 1, 10), workers=rooms)) == [2]
+    assert numbers(find_rooms(2, date(2000, 1, 10), date(2000, 1, 15), workers=rooms)) == [1]
+
+
+def test_find_free_projection(rooms):
+    # только колонки ответа, без моделей и их orders
+    assert find_rooms(1, date(2000, 1, 1), date(2000, 1, 7), workers=rooms) == [RoomView(3, 1, 100.0)]
+
+
+def test_find_free_departure_day(rooms):
+    # заезд в день выезда предыдущей брони
+    assert numbers(find_rooms(2, date(2000, 1, 7), date(2000, 1, 14), workers=rooms)) == [1, 2]
+
+
+def test_find_free_contains(rooms):
+    # бронь целиком внутри запрошенного интервала и наоборот
+    assert numbers(find_rooms(2, date(1999, 12, 30), date(2000, 1, 10), workers=rooms)) == [2]
+    assert numbers(find_rooms(2, date(2000, 1, 15), date(2000, 1, 20), workers=rooms)) == [1]
+
+
+def test_get_room_by_num(rooms):
+    assert get_room_by_num(2, workers=rooms).number == 2
+    with pytest.raises(RoomNotFound):
+        get_room_by_num(42, workers=rooms)
+
+
+def test_add_room_exists(rooms):
+    with pytest.raises(RoomExistError):
+        add_room(1, 2, 100, workers=rooms)
+
+
+def test_get_order_by_id(orders):
+    order = get_order_by_id(2, workers=orders)
+    assert order == OrderView(2, date(2000, 1, 14), date(2000, 1, 23))
+    with pytest.raises(OrderNotFound):
+        get_order_by_id(42, workers=orders)
+
+
+def test_room_orders_query_count(rooms, statements):
+    def book(count, start):
+        for i in range(count):
+            arrival = start + timedelta(days=i * 2)
+            booking(3, arrival, arrival + timedelta(days=1), rooms)
+
+    def count_queries():
+        statements.clear()
+        orders = get_room_orders(3, workers=rooms).items
+        return len(orders), len(statements)
+
+    # справочник комнат уже в памяти, считаются только запросы броней
+    get_rooms(workers=rooms)
+    book(2, date(2001, 1, 1))
+    orders, queries = count_queries()
+    assert orders == 2
+
+    book(10, date(2002, 1, 1))
+    orders, more_queries = count_queries()
+    assert orders == 12
+    assert more_queries == queries
+
+
+def test_booking(rooms):
+    identity = booking(3, date(2000, 1, 1), date(2000, 1, 7), rooms)
+    assert identity == 3
+    with pytest.raises(RoomNonFree):
+        booking(3, date(2000, 1, 6), date(2000, 1, 8), rooms)
+    assert get_room_orders(3, workers=rooms).items == [OrderView(3, date(2000, 1, 1), date(2000, 1, 7))]
+
+
+def test_booking_retry_on_conflict(rooms, monkeypatch):
+    class SerializationFailure(Exception):
+        pgcode = "40001"
+
+    calls = []
+    next_order_identity = RoomRepository.next_order_identity
+
+    def conflict_once(self):
+        calls.append(1)
+        if len(calls) == 1:
+            raise DBAPIError("SELECT", {}, SerializationFailure())
+        return next_order_identity(self)
+
+    monkeypatch.setattr(RoomRepository, "next_order_identity", conflict_once)
+    monkeypatch.setattr("time.sleep", lambda delay: None)
+    assert booking(3, date(2000, 1, 1), date(2000, 1, 7), rooms) == 3
+    assert len(calls) == 2
+
+
+def test_concurrent_booking_of_different_rooms(tmp_path, monkeypatch):
+    """на sqlite номер брони max + 1: обе брони читают один номер, вторая повторяется"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'orders.db'}")
+    metadata_obj.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Room(1, 2, 100), Room(2, 2, 100)])
+        session.commit()
+
+    barrier = threading.Barrier(2, timeout=5)
+    calls = []
+    next_order_identity = RoomRepository.next_order_identity
+
+    def same_identity(self):
+        identity = next_order_identity(self)
+        calls.append(identity)
+        # первые вызовы обоих потоков получают номер до коммита другого
+        if len(calls) <= 2:
+            barrier.wait()
+        return identity
+
+    monkeypatch.setattr(RoomRepository, "next_order_identity", same_identity)
+
+    def book(num):
+        workers = SqlAlchemyUOW(repo=RoomRepository, session=Session(engine))
+        return booking(num, date(2000, 1, 1), date(2000, 1, 7), workers)
+
+    try:
+        with ThreadPoolExecutor(2) as pool:
+            identities = list(pool.map(book, [1, 2]))
+    finally:
+        engine.dispose()
+    assert sorted(identities) == [1, 2]
+    assert calls[:2] == [1, 1]
+
+
+def test_catalog_cache(rooms, statements):
+    get_rooms(workers=rooms)
+    statements.clear()
+    assert numbers(get_rooms(workers=rooms).items) == [1, 2, 3]
+    assert get_room_by_num(2, workers=rooms) == RoomView(2, 2, 100.0)
+    assert statements == []
+    # add_room этого процесса сбрасывает справочник
+    add_room(4, 1, 100, workers=rooms)
+    assert numbers(get_rooms(workers=rooms).items) == [1, 2, 3, 4]
+
+
+def test_catalog_misses_room_added_elsewhere(rooms, dbsession):
+    get_rooms(workers=rooms)
+    # комната добавлена в обход сервиса, как из другого процесса
+    dbsession.add(Room(5, 2, 100))
+    dbsession.commit()
+    assert get_room_by_num(5, workers=rooms) == RoomView(5, 2, 100.0)
+    assert numbers(get_rooms(workers=rooms).items) == [1, 2, 3, 5]
+
+
+def test_catalog_version_check(rooms, dbsession, monkeypatch, statements):
+    monkeypatch.setattr(settings.CATALOG, "version_check", True)
+    get_rooms(workers=rooms)
+    statements.clear()
+    get_rooms(workers=rooms)
+    assert len(statements) == 1
+    # другой процесс увеличил версию справочника
+    RoomRepository(dbsession).bump_catalog_version(ROOMS)
+    dbsession.add(Room(5, 2, 100))
+    dbsession.commit()
+    assert numbers(get_rooms(workers=rooms).items) == [1, 2, 3, 5]
+    add_room(6, 2, 100, workers=rooms)
+    assert RoomRepository(dbsession).catalog_version(ROOMS) == 2
+
+
+def test_search_cache(rooms, orders, statements):
+    # отменить можно только будущую бронь
+    start = date.today() + timedelta(days=10)
+    first = (start, start + timedelta(days=4))
+    later = (start + timedelta(days=30), start + timedelta(days=34))
+    find_rooms(2, *first, workers=rooms)
+    find_rooms(2, *later, workers=rooms)
+    find_rooms(1, *first, workers=rooms)
+    statements.clear()
+    assert numbers(find_rooms(2, *first, workers=rooms)) == [1, 2]
+    assert statements == []
+
+    # бронь сбрасывает только пересекающиеся по датам записи той же вместимости
+    identity = booking(2, start + timedelta(days=2), start + timedelta(days=3), rooms)
+    statements.clear()
+    find_rooms(2, *later, workers=rooms)
+    find_rooms(1, *first, workers=rooms)
+    assert statements == []
+    assert numbers(find_rooms(2, *first, workers=rooms)) == [1]
+
+    delete_order(identity, workers=orders)
+    assert numbers(find_rooms(2, *first, workers=rooms)) == [1, 2]
+    # новая комната сбрасывает все записи своей вместимости
+    add_room(4, 1, 100, workers=rooms)
+    assert numbers(find_rooms(1, *first, workers=rooms)) == [3, 4]
+
+
+def test_search_cache_skips_raced_result(rooms, monkeypatch):
+    dates = (date(2000, 1, 8), date(2000, 1, 10))
+    find_free = RoomRepository.find_free
+
+    def booked_meanwhile(self, *args):
+        res = find_free(self, *args)
+        # параллельная бронь закоммичена и сбросила кэш, пока шел поиск
+        invalidate_search(2, *dates)
+        return res
+
+    monkeypatch.setattr(RoomRepository, "find_free", booked_meanwhile)
+    assert numbers(find_rooms(2, *dates, workers=rooms)) == [1, 2]
+    assert search_cache.get((2, *dates)) is None
+
+
+def test_rooms_pages(rooms):
+    first = get_rooms(workers=rooms, limit=2)
+    assert numbers(first.items) == [1, 2]
+    assert first.next == 2
+    last = get_rooms(workers=rooms, after=first.next, limit=2)
+    assert numbers(last.items) == [3]
+    assert last.next is None
+
+
+def test_room_orders_pages(rooms):
+    for i in range(3):
+        arrival = date(2001, 1, 1) + timedelta(days=i * 2)
+        booking(3, arrival, arrival + timedelta(days=1), rooms)
+    first = get_room_orders(3, workers=rooms, limit=2)
+    assert [i.identity for i in first.items] == [3, 4]
+    last = get_room_orders(3, workers=rooms, after=first.next, limit=2)
+    assert [i.identity for i in last.items] == [5]
+    assert last.next is None
+    with pytest.raises(RoomNotFound):
+        get_room_orders(4, workers=rooms)
@@ -3,7 +3,8 @@ from unittest.mock import MagicMock
 import pytest
 
 from hotel_california.domain.models import UserManager, User
-from hotel_california.service_layer.exceptions import UserNotAdmin, NotFoundEmail
+from hotel_california.service_layer.cache import token_cache
+from hotel_california.service_layer.exceptions import AuthenticationJwtError, UserNotAdmin, NotFoundEmail
 from hotel_california.service_layer.service.hotel import decode_token
 
 USER1 = User(
@@ -71,3 +72,25 @@ def test_get_access_token(manager):
     assert res['exp']
     assert res['iss'] == 'hotel_california'
     assert res['sub'] == 'test@email.com'
+    assert res['role'] == 'admin'
+    res = decode_token(manager.get_access_token(email="test2@email.com"))
+    assert res['role'] == 'manager'
+
+
+def test_decode_token_cached(manager):
+    token = manager.get_access_token(email="test@email.com")
+    token_cache.clear()
+    misses, hits = token_cache.misses, token_cache.hits
+    assert decode_token(token) == decode_token(token)
+    assert token_cache.misses - misses == 1
+    assert token_cache.hits - hits == 1
+    # с другой audience токен проверяется заново
+    decode_token(token, audience="/users/token/refresh/")
+    assert token_cache.misses - misses == 2
+
+
+def test_decode_token_expired_not_cached(manager):
+    token = manager.get_access_token(email="test@email.com", expires_delta=-1)
+    for _ in range(2):
+        with pytest.raises(AuthenticationJwtError):
+            decode_token(token)